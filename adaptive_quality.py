@@ -0,0 +1,136 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Telegram's limits for send_photo; anything beyond has to go through send_document
+PHOTO_MAX_BYTES = 10 * 1024 * 1024
+PHOTO_MAX_DIMENSIONS_SUM = 10000
+PHOTO_MAX_ASPECT_RATIO = 20
+
+
+def needs_document(width: int, height: int, size: int) -> bool:
+    """
+    Check whether an image exceeds Telegram's photo limits.
+
+    Args:
+        width: Image width in pixels.
+        height: Image height in pixels.
+        size: Encoded size in bytes.
+
+    Returns:
+        bool: True if the image must be sent with send_document.
+    """
+    return (
+        size > PHOTO_MAX_BYTES
+        or width + height > PHOTO_MAX_DIMENSIONS_SUM
+        or max(width, height) > PHOTO_MAX_ASPECT_RATIO * max(1, min(width, height))
+    )
+
+
+class BandwidthEstimator:
+    def __init__(self, smoothing: float = 0.3, min_sample_bytes: int = 16 * 1024):
+        """
+        Estimate upload bandwidth from recent send timings.
+
+        Args:
+            smoothing: Weight of the newest sample in the exponential moving average.
+            min_sample_bytes: Ignore uploads smaller than this; their timing is dominated by latency.
+        """
+        self.smoothing = smoothing
+        self.min_sample_bytes = min_sample_bytes
+        self.bytes_per_second = None
+        self.lock = threading.Lock()
+
+    def record(self, size: int, seconds: float) -> None:
+        """
+        Add one upload timing.
+
+        Args:
+            size: Uploaded bytes.
+            seconds: Time the upload request took.
+        """
+        if size < self.min_sample_bytes or seconds <= 0:
+            return
+        sample = size / seconds
+        with self.lock:
+            if self.bytes_per_second is None:
+                self.bytes_per_second = sample
+            else:
+                self.bytes_per_second += self.smoothing * (sample - self.bytes_per_second)
+
+    def estimate(self):
+        """
+        Returns:
+            Estimated bytes per second, or None before the first usable sample.
+        """
+        with self.lock:
+            return self.bytes_per_second
+
+
+class AdaptiveQuality:
+    def __init__(self, estimator: BandwidthEstimator, target_latency: float = 5.0,
+                 max_bytes: int = PHOTO_MAX_BYTES, min_quality: int = 40, min_scale: float = 0.25,
+                 max_attempts: int = 4):
+        """
+        Pick encode quality and resolution so images fit a byte budget.
+
+        The budget is what the estimated bandwidth can upload within the target
+        latency, capped by Telegram's photo size limit.
+
+        Args:
+            estimator: Bandwidth estimator fed by the uploader.
+            target_latency: Desired upload time per image in seconds.
+            max_bytes: Hard cap on the encoded size.
+            min_quality: Lowest JPEG/WebP quality to fall back to.
+            min_scale: Smallest downscale factor relative to the captured size.
+            max_attempts: Maximum number of encodes per image.
+        """
+        self.estimator = estimator
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.min_quality = min_quality
+        self.min_scale = min_scale
+        self.max_attempts = max_attempts
+
+    def byte_budget(self) -> int:
+        """
+        Returns:
+            int: Encoded size an image should not exceed right now.
+        """
+        bandwidth = self.estimator.estimate()
+        if bandwidth is None:
+            return self.max_bytes
+        return int(min(self.max_bytes, bandwidth * self.target_latency))
+
+    def initial_scale(self, width: int, height: int) -> float:
+        """
+        Returns:
+            float: Downscale factor that brings an image within the photo dimension limit.
+        """
+        return min(1.0, PHOTO_MAX_DIMENSIONS_SUM / (width + height))
+
+    def adjust(self, quality: int, scale: float, size: int, budget: int, lossy: bool):
+        """
+        Choose the parameters for the next encode after one came out too large.
+
+        Quality is lowered first for lossy formats since it is cheaper in visible
+        detail than resolution; once it bottoms out the image is downscaled.
+
+        Args:
+            quality: Quality of the last encode.
+            scale: Downscale factor of the last encode.
+            size: Size of the last encode in bytes.
+            budget: Byte budget to fit.
+            lossy: Whether the format has a quality setting.
+
+        Returns:
+            tuple: The next (quality, scale), or None if nothing is left to reduce.
+        """
+        ratio = budget / size
+        if lossy and quality > self.min_quality:
+            return max(self.min_quality, int(quality * ratio ** 0.5)), scale
+        if scale > self.min_scale:
+            # Encoded size scales roughly with the pixel count
+            return quality, max(self.min_scale, scale * min(0.9, ratio ** 0.5))
+        return None
@@ -0,0 +1,218 @@
+"""
+End-to-end benchmark of the capture -> encode -> upload pipeline against a local fake Bot API.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_uploader --images 50 --resolutions 1920x1080,3840x2160 --latency 0.1
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from PIL import Image, ImageDraw
+from telebot import apihelper
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_bot_api import FakeBotApi  # noqa: E402
+from adaptive_quality import AdaptiveQuality  # noqa: E402
+from image_encoder import ImageEncoder  # noqa: E402
+from metrics import REGISTRY as metrics  # noqa: E402
+from rate_limiter import ChannelRateLimiter  # noqa: E402
+from telegram_client import configure_session, get_bot  # noqa: E402
+from telegram_uploader import TelegramScreenshotUploader  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BENCHMARK_TOKEN = "123456:BENCHMARK"
+BENCHMARK_CHANNEL = "-1000000000001"
+
+
+def synthetic_screenshot(width: int, height: int, rng: random.Random) -> Image.Image:
+    """
+    Draw a screenshot-like image: flat window panels, title bars and lines of "text".
+
+    Args:
+        width: Image width in pixels.
+        height: Image height in pixels.
+        rng: Random generator, so every run draws the same images.
+
+    Returns:
+        Image.Image: The synthetic RGB image.
+    """
+    image = Image.new("RGB", (width, height), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        left, top = rng.randrange(width - 50), rng.randrange(height - 50)
+        right, bottom = min(width, left + rng.randrange(50, width // 2)), min(height, top + rng.randrange(50, height // 2))
+        draw.rectangle((left, top, right, bottom), fill=(rng.randrange(200, 256),) * 3, outline=(0, 0, 0))
+        draw.rectangle((left, top, right, top + 24), fill=(rng.randrange(64), rng.randrange(64), rng.randrange(128, 256)))
+        for y in range(top + 32, bottom - 12, 18):
+            draw.line((left + 8, y, left + 8 + rng.randrange(max(1, right - left - 16)), y), fill=(20, 20, 20), width=8)
+    return image
+
+
+def rss_mb() -> float:
+    if psutil:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    try:
+        import resource
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+    except ImportError:
+        return 0.0
+
+
+def run_case(args, width: int, height: int) -> dict:
+    """
+    Push args.images synthetic captures of one resolution through the pipeline.
+
+    Returns:
+        dict: Throughput, latency, CPU and memory results for the case.
+    """
+    rng = random.Random(args.seed)
+    frames = [synthetic_screenshot(width, height, rng) for _ in range(min(args.images, args.distinct_frames))]
+    save_path = tempfile.mkdtemp(prefix="photel-bench-")
+    unsent_directory = os.path.join(save_path, "unsent")
+
+    metrics.reset()
+    uploader = TelegramScreenshotUploader(
+        get_bot(BENCHMARK_TOKEN),
+        BENCHMARK_CHANNEL,
+        num_workers=args.workers,
+        rate_limiter=ChannelRateLimiter(per_minute=args.rate_limit, global_per_second=args.rate_limit),
+        album_window=args.album_window,
+        # Frames repeat every --distinct-frames, so a cache would turn most uploads into file_id sends
+        file_id_cache_size=args.file_id_cache
+    )
+    uploader.set_unsent_directory(unsent_directory)
+    policy = AdaptiveQuality(uploader.bandwidth, target_latency=args.target_latency) if args.target_latency else None
+    encoder = ImageEncoder(image_format=args.format, quality=args.quality, max_workers=args.encoder_workers,
+                           quality_policy=policy)
+    done = threading.Semaphore(0)
+
+    def on_complete(success):
+        done.release()
+
+    def enqueue(encoded, captured_at):
+        if encoded.buffer is not None:
+            uploader.enqueue_image_buffer(
+                encoded.buffer, encoded.filename, captured_at=captured_at, on_complete=on_complete
+            )
+        else:
+            uploader.enqueue_screenshot(encoded.path, captured_at=captured_at, on_complete=on_complete)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    interval = 1.0 / args.capture_rate if args.capture_rate else 0
+    for index in range(args.images):
+        captured_at = time.monotonic()
+        frame = frames[index % len(frames)].copy()
+        encoder.submit(
+            frame,
+            f"bench_{index:05d}",
+            lambda encoded, captured_at=captured_at: enqueue(encoded, captured_at),
+            target_path=None if args.in_memory else save_path
+        )
+        if interval:
+            time.sleep(max(0.0, interval - (time.monotonic() - captured_at)))
+    for _ in range(args.images):
+        done.acquire()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    encoder.shutdown()
+    uploader.stop()
+    snapshot = metrics.snapshot()
+    end_to_end = snapshot["histograms"].get("end_to_end_seconds", {})
+    counters = snapshot["counters"]
+    return {
+        "resolution": f"{width}x{height}",
+        "images": args.images,
+        "uploaded": counters.get("uploads_total", 0),
+        "failed": counters.get("upload_failures_total", 0),
+        "file_id_reuses": counters.get("file_id_reuses_total", 0),
+        "images_per_second": args.images / wall,
+        "p50_ms": end_to_end.get("p50", 0.0) * 1000,
+        "p99_ms": end_to_end.get("p99", 0.0) * 1000,
+        "avg_bytes": counters.get("encoded_bytes_total", 0) / args.images,
+        "cpu_seconds": cpu,
+        "cpu_percent": cpu / wall * 100,
+        "rss_mb": rss_mb(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=30, help="captures per resolution")
+    parser.add_argument("--resolutions", default="1280x720,1920x1080,3840x2160")
+    parser.add_argument("--distinct-frames", type=int, default=4, help="synthetic frames drawn per resolution")
+    parser.add_argument("--capture-rate", type=float, default=0, help="captures per second, 0 for as fast as possible")
+    parser.add_argument("--workers", type=int, default=3, help="upload workers")
+    parser.add_argument("--encoder-workers", type=int, default=2)
+    parser.add_argument("--album-window", type=float, default=0.0)
+    parser.add_argument("--format", default="png", choices=["png", "jpeg", "webp"])
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--target-latency", type=float, default=0,
+                        help="adapt encoding to this upload time per image in seconds, 0 disables")
+    parser.add_argument("--file-id-cache", type=int, default=0,
+                        help="file_id cache size, 0 uploads the bytes of every image")
+    parser.add_argument("--in-memory", action="store_true", help="skip the disk round trip")
+    parser.add_argument("--rate-limit", type=float, default=100000, help="messages per minute allowed by the limiter")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency in seconds")
+    parser.add_argument("--bandwidth", type=float, default=0, help="fake API upload bandwidth in bytes/s, 0 = unlimited")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="probability of a 429 response")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of a 500 response")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--log-level", default="ERROR", help="log level for the pipeline modules")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> list:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s')
+    api = FakeBotApi(
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        failure_rate=args.failure_rate,
+        seed=args.seed
+    )
+    apihelper.API_URL = api.api_url
+    configure_session(args.workers + 2)
+
+    results = []
+    try:
+        for resolution in args.resolutions.split(","):
+            width, height = (int(value) for value in resolution.lower().split("x"))
+            results.append(run_case(args, width, height))
+    finally:
+        api.stop()
+
+    header = f"{'resolution':>11} {'img/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'avg KiB':>8} {'CPU %':>6} {'RSS MiB':>8} {'failed':>6} {'reused':>6}"
+    print(header)
+    for result in results:
+        print(f"{result['resolution']:>11} {result['images_per_second']:>7.2f} {result['p50_ms']:>8.1f} "
+              f"{result['p99_ms']:>8.1f} {result['avg_bytes'] / 1024:>8.1f} {result['cpu_percent']:>6.1f} "
+              f"{result['rss_mb']:>8.1f} {result['failed']:>6} {result['file_id_reuses']:>6}")
+    print(f"Fake API requests: {api.requests}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=4)
+    return results
+
+
+if __name__ == "__main__":
+    main()
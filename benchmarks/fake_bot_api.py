@@ -0,0 +1,136 @@
+import json
+import time
+import random
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FakeBotApi:
+    def __init__(self, latency: float = 0.05, bandwidth: float = 0, rate_429: float = 0.0,
+                 retry_after: int = 1, failure_rate: float = 0.0, port: int = 0, seed: int = None):
+        """
+        Start a local stand-in for the Telegram Bot API.
+
+        It answers getMe, sendMessage, sendPhoto, sendDocument, sendAnimation and sendMediaGroup
+        with well-formed responses after simulating network conditions.
+
+        Args:
+            latency: Seconds added to every request.
+            bandwidth: Upload bandwidth in bytes per second used to delay requests by
+                their body size. 0 means unlimited.
+            rate_429: Probability of answering 429 Too Many Requests.
+            retry_after: retry_after value sent with 429 responses.
+            failure_rate: Probability of answering 500 Internal Server Error.
+            port: TCP port to listen on; 0 picks a free port.
+            seed: Seed for the random fault injection, for reproducible runs.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.message_ids = itertools.count(1)
+        self.stats_lock = threading.Lock()
+        self.requests = {}
+        self.bytes_received = 0
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(handler):
+                api._handle(handler)
+
+            do_GET = do_POST
+
+            def log_message(handler, format, *args):
+                logger.debug("Fake Bot API: " + format, *args)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="FakeBotApi")
+        self.thread.start()
+        logger.info("Fake Bot API listening on %s", self.api_url)
+
+    @property
+    def api_url(self) -> str:
+        """URL template in the format expected by telebot.apihelper.API_URL."""
+        return f"http://127.0.0.1:{self.server.server_port}/bot{{0}}/{{1}}"
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _roll(self, probability: float) -> bool:
+        with self.random_lock:
+            return probability > 0 and self.random.random() < probability
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        method = handler.path.rstrip("/").split("/")[-1].split("?")[0]
+        with self.stats_lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+            self.bytes_received += len(body)
+
+        delay = self.latency + (len(body) / self.bandwidth if self.bandwidth else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if self._roll(self.rate_429):
+            status, payload = 429, {
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        elif self._roll(self.failure_rate):
+            status, payload = 500, {"ok": False, "error_code": 500, "description": "Internal Server Error"}
+        else:
+            status, payload = 200, {"ok": True, "result": self._result(method, body)}
+
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _message(self, **content) -> dict:
+        message_id = next(self.message_ids)
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": -1000000000001, "type": "channel", "title": "Benchmark"},
+        }
+        message.update(content)
+        return message
+
+    def _file(self, kind: str) -> dict:
+        file_number = next(self.message_ids)
+        return {"file_id": f"{kind}-{file_number}", "file_unique_id": f"u{file_number}", "width": 1, "height": 1}
+
+    def _result(self, method: str, body: bytes):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+        if method == "sendPhoto":
+            return self._message(photo=[self._file("photo")])
+        if method == "sendDocument":
+            document = self._file("document")
+            del document["width"], document["height"]
+            return self._message(document=document)
+        if method == "sendAnimation":
+            animation = self._file("animation")
+            animation.update(duration=1)
+            return self._message(animation=animation, document=dict(animation))
+        if method == "sendMediaGroup":
+            # One message per attached file
+            return [self._message(photo=[self._file("photo")]) for _ in range(max(1, body.count(b'filename=')))]
+        return self._message(text="ok")
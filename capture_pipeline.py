@@ -0,0 +1,457 @@
+import os
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, Future
+from telegram_client import configure_session, get_bot, validate_token
+from telegram_uploader import TelegramScreenshotUploader, PRIORITY_LIVE
+from rate_limiter import ChannelRateLimiter
+from image_encoder import ImageEncoder
+from adaptive_quality import AdaptiveQuality, needs_document
+from screen_capture import grab_screen, next_capture_mode, create_grab_backend, list_monitors, parse_region
+from capture_scheduler import CaptureScheduler
+from metrics import REGISTRY as metrics
+from config_manager import load_settings, save_settings, parse_channel_ids
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CapturePipeline:
+    def __init__(self, api_token: str, channel_id, save_path: str, settings: dict = None):
+        """
+        Capture, encode and upload screenshots, independent of any user interface.
+
+        Both the window and the headless daemon drive the same pipeline.
+
+        Args:
+            api_token: Telegram API token.
+            channel_id: Target Telegram channel ID, or several as a list or comma-separated string.
+            save_path: Directory for screenshots and the unsent backlog.
+            settings: Application settings; loaded from the config file if omitted.
+        """
+        self.api_token = api_token
+        self.channel_ids = parse_channel_ids(channel_id)
+        self.save_path = save_path
+        self.settings = settings or load_settings()
+        self.bot = None
+        self.uploader = None
+        self.encoder = None
+        self.deduplicator = None
+        self.scheduler = None
+        self.metrics_server = None
+        self.metrics_dumper = None
+        self.watcher = None
+        self.replay = None
+        self.capture_executor = None
+        self.grab_backend = None
+        # Monitor boxes read by the capture thread when it opened the backend
+        self.monitor_boxes = None
+        self.capture_lock = threading.Lock()
+        self.captures_pending = 0
+        # Called with the file name once a capture is encoded and queued, from an encoder thread
+        self.on_queued = None
+        # Called for the caption of captures made without one, e.g. by the scheduler
+        self.caption_provider = None
+
+    def start(self) -> None:
+        """
+        Validate the token and start the upload, encode and scheduling stages.
+
+        Optional stages are only imported when enabled in the settings.
+
+        Raises:
+            ValueError: If the save path is not a directory or no channel is configured.
+            telebot.apihelper.ApiException: If Telegram rejects the token.
+        """
+        if not os.path.isdir(self.save_path):
+            raise ValueError(f"Invalid save path: {self.save_path}")
+        if not self.channel_ids:
+            raise ValueError("No channel ID configured")
+        settings = self.settings
+        # One pooled connection per upload worker, plus polling and text messages
+        configure_session(settings["upload_workers"] + 2)
+        self.bot = get_bot(self.api_token)
+        validate_token(self.api_token)
+
+        journal = None
+        if settings["durable_queue"]:
+            from upload_journal import UploadJournal
+            journal = UploadJournal(os.path.join(self.save_path, "upload_journal.sqlite3"))
+        self.uploader = TelegramScreenshotUploader(
+            self.bot,
+            self.channel_ids,
+            num_workers=settings["upload_workers"],
+            rate_limiter=ChannelRateLimiter(per_minute=settings["rate_limit_per_minute"]),
+            sequence_captions=settings["sequence_captions"],
+            album_window=settings["album_window"],
+            journal=journal,
+            file_id_cache_size=settings["file_id_cache_size"]
+        )
+        self.uploader.set_unsent_directory(os.path.join(self.save_path, 'unsent'))
+        self.uploader.resume_journal()
+        if settings["redrain_unsent"]:
+            self.uploader.start_redrain(interval=settings["redrain_interval"])
+        self.encoder = ImageEncoder(
+            image_format=settings["encoder_format"],
+            quality=settings["encoder_quality"],
+            compress_level=settings["png_compress_level"],
+            max_edge=settings["max_edge"],
+            max_workers=settings["encoder_workers"],
+            quality_policy=AdaptiveQuality(
+                self.uploader.bandwidth,
+                target_latency=settings["target_upload_latency"]
+            ) if settings["adaptive_quality"] and not settings["full_fidelity"] else None
+        )
+        if settings["dedup_enabled"]:
+            from frame_dedup import FrameDeduplicator
+            self.deduplicator = FrameDeduplicator(
+                threshold=settings["dedup_threshold"],
+                history=settings["dedup_history"]
+            )
+        if settings["metrics_port"]:
+            from metrics import MetricsServer
+            self.metrics_server = MetricsServer(port=settings["metrics_port"])
+        if settings["metrics_dump_path"]:
+            from metrics import MetricsDumper
+            self.metrics_dumper = MetricsDumper(settings["metrics_dump_path"], settings["metrics_dump_interval"])
+        # One dedicated thread owns the grab backend and runs every capture in order
+        self.capture_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="CaptureWorker", initializer=self._open_backend
+        )
+        metrics.register_gauge("capture_queue_depth", self.pending_captures)
+        if settings["watch_directories"]:
+            self.watcher = self._start_watcher(settings["watch_directories"])
+        if settings["replay_enabled"]:
+            from replay_buffer import ReplayRecorder
+            self.replay = ReplayRecorder(
+                grab=self._grab,
+                submit=self.capture_executor.submit,
+                seconds=settings["replay_seconds"],
+                fps=settings["replay_fps"],
+                max_edge=settings["replay_max_edge"],
+                max_memory_mb=settings["replay_max_memory_mb"],
+                max_cpu_percent=settings["replay_max_cpu_percent"]
+            )
+        self.scheduler = CaptureScheduler(
+            capture=lambda: self.request_capture(droppable=True),
+            queue_depth=lambda: (self.pending_captures() + self.encoder.pending()
+                                 + self.uploader.pending_count(PRIORITY_LIVE)),
+            drop_oldest=self.uploader.drop_oldest,
+            max_depth=settings["max_pending_frames"],
+            policy=settings["backpressure_policy"]
+        )
+        logger.info("Capture pipeline started for channel(s) %s.", ", ".join(self.channel_ids))
+
+    def request_capture(self, caption: str = None, requested_at: float = None, droppable: bool = False) -> Future:
+        """
+        Ask the capture thread for a screenshot without waiting for it.
+
+        Cheap enough to call from a keyboard hook: the grab, dedup check and
+        encoder hand-off all run on the capture thread.
+
+        Args:
+            caption: Optional caption for the screenshot. Falls back to caption_provider.
+            requested_at: time.monotonic() of the hotkey press or scheduler tick;
+                defaults to now. Press-to-pixels latency is measured from it.
+            droppable: Let backpressure drop the screenshot while it waits for upload,
+                as for timed captures.
+
+        Returns:
+            Future: Resolves to the screenshot's file stem, or None if the frame was
+                skipped as a duplicate.
+
+        Raises:
+            RuntimeError: If the pipeline has not been started.
+        """
+        if not self.capture_executor:
+            raise RuntimeError("Screenshot uploader not ready")
+        with self.capture_lock:
+            self.captures_pending += 1
+        future = self.capture_executor.submit(
+            self._capture, caption, time.monotonic() if requested_at is None else requested_at, droppable
+        )
+        future.add_done_callback(self._on_capture_done)
+        return future
+
+    def pending_captures(self) -> int:
+        """
+        Returns:
+            int: Number of requested captures not grabbed yet.
+        """
+        with self.capture_lock:
+            return self.captures_pending
+
+    def capture(self, caption: str = None):
+        """
+        Take a screenshot and wait until it is handed to the encoder.
+
+        Args:
+            caption: Optional caption for the screenshot. Falls back to caption_provider.
+
+        Returns:
+            The screenshot's file stem, or None if the frame was skipped as a duplicate.
+
+        Raises:
+            RuntimeError: If the pipeline has not been started.
+        """
+        return self.request_capture(caption).result()
+
+    def save_replay(self, caption: str = None) -> Future:
+        """
+        Send the last seconds of the replay buffer as an animation.
+
+        Encoding runs on the replay encoder thread; the animation is then queued
+        like any live screenshot.
+
+        Args:
+            caption: Optional caption. Falls back to caption_provider.
+
+        Returns:
+            Future: Resolves to the replay's file name, or None if nothing was recorded yet.
+
+        Raises:
+            RuntimeError: If replay recording is not enabled.
+        """
+        if not self.replay:
+            raise RuntimeError("Replay recording is not enabled")
+        if caption is None and self.caption_provider:
+            caption = self.caption_provider()
+        image_format = self.settings["replay_format"]
+
+        def enqueue(buffer):
+            # Telegram only plays GIFs inline; a WebP sent as a photo would lose its frames
+            self.uploader.enqueue_image_buffer(
+                buffer, buffer.name, caption=caption,
+                as_animation=image_format == "gif", as_document=image_format != "gif"
+            )
+            if self.on_queued:
+                self.on_queued(buffer.name)
+
+        return self.replay.save(image_format, enqueue)
+
+    def send_text(self, text: str, on_complete=None) -> None:
+        """
+        Queue a text message ahead of any screenshots.
+
+        Args:
+            text: Message text.
+            on_complete: Optional callback invoked with True or False from an upload
+                worker thread once the message was sent or gave up.
+
+        Raises:
+            RuntimeError: If the pipeline has not been started.
+        """
+        if not self.uploader:
+            raise RuntimeError("Uploader not ready")
+        self.uploader.enqueue_message(text, on_complete=on_complete)
+
+    def cycle_capture_mode(self) -> str:
+        """
+        Switch to the next capture mode and persist it.
+
+        Returns:
+            str: Human-readable name of the new mode.
+
+        Raises:
+            RuntimeError: If the settings could not be saved.
+        """
+        mode, monitor = next_capture_mode(
+            self.settings["capture_mode"],
+            self.settings["capture_monitor"],
+            bool(self.settings["capture_region"]),
+            monitors=self.monitors()
+        )
+        settings = dict(self.settings, capture_mode=mode, capture_monitor=monitor)
+        save_settings(settings)
+        self.settings.update(settings)
+        label = f"monitor {monitor + 1}" if mode == "monitor" else mode
+        logger.info("Capture mode changed to: %s", label)
+        return label
+
+    def set_capture_region(self, region) -> str:
+        """
+        Save the area captured in "region" mode and switch to that mode.
+
+        Args:
+            region: (left, top, right, bottom) box or "left,top,right,bottom" string in
+                virtual-desktop coordinates, or None to clear the saved region.
+
+        Returns:
+            str: Human-readable description of the change.
+
+        Raises:
+            ValueError: If the region is malformed.
+            RuntimeError: If the settings could not be saved.
+        """
+        region = parse_region(region)
+        settings = dict(self.settings, capture_region=list(region) if region else None)
+        if region:
+            settings["capture_mode"] = "region"
+            label = "region {}x{} at {},{}".format(region[2] - region[0], region[3] - region[1], *region[:2])
+        else:
+            if settings["capture_mode"] == "region":
+                settings["capture_mode"] = "full"
+            label = "region cleared"
+        save_settings(settings)
+        self.settings.update(settings)
+        logger.info("Capture %s", label)
+        return label
+
+    def monitors(self) -> list:
+        """
+        List the monitors the grab backend can capture.
+
+        Never waits for the capture thread, so it is safe to call from the UI thread.
+
+        Returns:
+            list: (left, top, right, bottom) boxes in virtual-desktop coordinates.
+        """
+        if self.monitor_boxes is not None:
+            return list(self.monitor_boxes)
+        return list_monitors()
+
+    def status(self) -> dict:
+        """
+        Summarize the state of every stage.
+
+        Returns:
+            dict: Capture mode, queue depths, connectivity and per-stage statistics.
+        """
+        status = {
+            "channel_ids": self.channel_ids,
+            "capture_mode": self.settings["capture_mode"],
+            "capture_region": self.settings["capture_region"],
+            "running": self.uploader is not None,
+        }
+        if self.uploader:
+            status.update(
+                upload_queue=self.uploader.screenshot_queue.qsize(),
+                upload_retries=self.uploader.retry_scheduler.pending(),
+                offline=self.uploader.offline,
+                bandwidth_bytes_per_second=self.uploader.bandwidth.estimate(),
+                encoder=self.encoder.stats(),
+                encode_queue=self.encoder.pending(),
+                capture_queue=self.pending_captures(),
+                grab_backend=self.grab_backend.name if self.grab_backend else None,
+                scheduler=dict(self.scheduler.stats(), running=self.scheduler.running),
+            )
+        if self.deduplicator:
+            status["dedup"] = self.deduplicator.stats()
+        if self.watcher:
+            status["watcher"] = self.watcher.stats()
+        if self.replay:
+            status["replay"] = self.replay.stats()
+        return status
+
+    def stop(self) -> None:
+        """Stop scheduled captures, flush pending encodes and stop the uploader."""
+        if self.scheduler and self.scheduler.running:
+            self.scheduler.stop()
+        if self.watcher:
+            self.watcher.stop()
+        if self.replay:
+            self.replay.stop()
+        if self.capture_executor:
+            self.capture_executor.submit(self._close_backend)
+            self.capture_executor.shutdown(wait=True)
+        if self.encoder:
+            self.encoder.shutdown()
+        if self.uploader:
+            self.uploader.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.metrics_dumper:
+            self.metrics_dumper.stop()
+        logger.info("Capture pipeline stopped.")
+
+    def _start_watcher(self, directories: list):
+        from directory_watcher import DirectoryWatcher
+
+        # Our own screenshots are already queued; watching them would send them twice
+        own = {os.path.abspath(self.save_path), os.path.abspath(self.uploader.unsent_directory)}
+        directories = [directory for directory in directories if os.path.abspath(directory) not in own]
+        if not directories:
+            logger.warning("Watch directories must differ from the save path and the unsent directory.")
+            return None
+        return DirectoryWatcher(
+            self.uploader,
+            directories,
+            index_path=os.path.join(self.save_path, "watch_index.jsonl"),
+            settle_seconds=self.settings["watch_settle_seconds"],
+            poll_interval=self.settings["watch_poll_interval"]
+        )
+
+    def _open_backend(self) -> None:
+        # Runs on the capture thread, which then keeps the handle for its lifetime
+        self.grab_backend = create_grab_backend(self.settings["grab_backend"])
+        logger.info("Screen grab backend: %s", self.grab_backend.name)
+        try:
+            self.monitor_boxes = self.grab_backend.monitors()
+        except Exception as e:
+            logger.warning("Could not list monitors through %s: %s", self.grab_backend.name, e)
+
+    def _close_backend(self) -> None:
+        if self.grab_backend:
+            self.grab_backend.close()
+            self.grab_backend = None
+
+    def _on_capture_done(self, future: Future) -> None:
+        with self.capture_lock:
+            self.captures_pending -= 1
+        error = future.exception()
+        if error is not None:
+            logger.error("Error capturing screenshot: %s", error)
+
+    def _grab(self):
+        # Only called on the capture thread, which owns the grab backend
+        return grab_screen(
+            self.settings["capture_mode"],
+            monitor=self.settings["capture_monitor"],
+            region=self.settings["capture_region"],
+            backend=self.grab_backend
+        )
+
+    def _capture(self, caption: str, requested_at: float, droppable: bool = False):
+        grab_start = time.monotonic()
+        screenshot = self._grab()
+        grabbed_at = time.monotonic()
+        metrics.observe("grab_seconds", grabbed_at - grab_start)
+        metrics.observe("press_to_pixels_seconds", grabbed_at - requested_at)
+        metrics.inc("captures_total")
+        stem = f"screenshot_{datetime.now().strftime('%Y%m%d%H%M%S%f')[:-3]}"
+
+        if caption is None and self.caption_provider:
+            caption = self.caption_provider()
+        frame_hash = None
+        if self.deduplicator:
+            is_duplicate, frame_hash = self.deduplicator.check(screenshot)
+            if is_duplicate:
+                metrics.inc("duplicates_skipped_total")
+                return None
+
+        self.encoder.submit(
+            screenshot,
+            stem,
+            lambda encoded: self._enqueue_encoded(encoded, caption, frame_hash, requested_at, droppable),
+            target_path=None if self.settings["in_memory_uploads"] else self.save_path
+        )
+        return stem
+
+    def _enqueue_encoded(self, encoded, caption: str, frame_hash: int = None, captured_at: float = None,
+                         droppable: bool = False) -> None:
+        if frame_hash is not None:
+            self.deduplicator.record_size(frame_hash, encoded.size)
+        as_document = self.settings["full_fidelity"] or needs_document(encoded.width, encoded.height, encoded.size)
+        if encoded.buffer is not None:
+            self.uploader.enqueue_image_buffer(
+                encoded.buffer, encoded.filename, caption=caption, captured_at=captured_at,
+                as_document=as_document, droppable=droppable
+            )
+        else:
+            self.uploader.enqueue_screenshot(
+                encoded.path, caption=caption, captured_at=captured_at, as_document=as_document,
+                droppable=droppable
+            )
+        if self.on_queued:
+            self.on_queued(encoded.filename)
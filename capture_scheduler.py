@@ -0,0 +1,171 @@
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_POLICIES = ("drop_oldest", "throttle")
+
+# How far the throttle policy may stretch the capture period
+MAX_THROTTLE_FACTOR = 8
+
+
+class CaptureScheduler:
+    def __init__(self, capture, queue_depth, drop_oldest=None, max_depth: int = 20,
+                 policy: str = "drop_oldest"):
+        """
+        Initialize the timed capture scheduler.
+
+        Captures run on a single scheduler thread against deadlines on the monotonic
+        clock, so slow captures never make the schedule drift.
+
+        Args:
+            capture: Callable taking one screenshot.
+            queue_depth: Callable returning the number of frames waiting to be encoded or uploaded.
+            drop_oldest: Callable dropping the oldest waiting frame; returns True if one was dropped.
+            max_depth: Queue depth at which backpressure kicks in.
+            policy: "drop_oldest" drops waiting frames to make room, "throttle" halves
+                the capture rate until the queues drain.
+
+        Raises:
+            ValueError: If the policy is unknown.
+        """
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.capture = capture
+        self.queue_depth = queue_depth
+        self.drop_oldest = drop_oldest
+        self.max_depth = max_depth
+        self.policy = policy
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self._reset_stats(0.0)
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start_interval(self, seconds: float) -> None:
+        """
+        Capture every given number of seconds until stopped.
+
+        Args:
+            seconds: Capture period.
+        """
+        self._start(seconds, None, f"every {seconds}s")
+
+    def start_burst(self, frames: int, fps: float) -> None:
+        """
+        Capture a fixed number of frames at a set frame rate.
+
+        Args:
+            frames: Number of frames to capture.
+            fps: Target frames per second.
+        """
+        self._start(1.0 / fps, frames, f"burst of {frames} at {fps} fps")
+
+    def stop(self) -> None:
+        """Stop the running schedule and wait for the scheduler thread."""
+        self.stop_event.set()
+        if self.running and threading.current_thread() is not self.thread:
+            self.thread.join()
+
+    def stats(self) -> dict:
+        """
+        Report the target and achieved capture rate of the current or last schedule.
+
+        Returns:
+            dict: Target and achieved fps, captured, dropped and throttled frame counts.
+        """
+        with self.lock:
+            end = self.finished or time.monotonic()
+            elapsed = end - self.started if self.started else 0.0
+            return {
+                "target_fps": 1.0 / self.base_period if self.base_period else 0.0,
+                "achieved_fps": self.captured / elapsed if elapsed > 0 else 0.0,
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "throttled": self.throttled,
+                "missed_deadlines": self.missed,
+            }
+
+    def _reset_stats(self, period: float) -> None:
+        with self.lock:
+            self.base_period = period
+            self.started = time.monotonic() if period else 0.0
+            self.finished = 0.0
+            self.captured = 0
+            self.dropped = 0
+            self.throttled = 0
+            self.missed = 0
+
+    def _start(self, period: float, count, description: str) -> None:
+        self.stop()
+        self.stop_event.clear()
+        self._reset_stats(period)
+        self.thread = threading.Thread(
+            target=self._run, args=(period, count, description), daemon=True, name="CaptureScheduler"
+        )
+        self.thread.start()
+        logger.info("Capture schedule started: %s", description)
+
+    def _run(self, period: float, count, description: str) -> None:
+        """Scheduler thread capturing frames on monotonic deadlines."""
+        current_period = period
+        deadline = time.monotonic()
+        frames = 0
+        while not self.stop_event.is_set() and (count is None or frames < count):
+            remaining = deadline - time.monotonic()
+            if remaining > 0 and self.stop_event.wait(remaining):
+                break
+            frames += 1
+            admitted, depth = self._admit_frame()
+            if admitted:
+                try:
+                    self.capture()
+                    with self.lock:
+                        self.captured += 1
+                except Exception as e:
+                    logger.error("Scheduled capture failed: %s", e)
+            if self.policy == "throttle":
+                if not admitted:
+                    current_period = min(period * MAX_THROTTLE_FACTOR, current_period * 2)
+                elif current_period > period and depth <= self.max_depth // 2:
+                    current_period = max(period, current_period / 2)
+            deadline += current_period
+            now = time.monotonic()
+            if deadline < now:
+                # Skip the ticks we could not keep up with instead of bursting to catch up
+                skipped = int((now - deadline) / current_period) + 1
+                deadline += skipped * current_period
+                with self.lock:
+                    self.missed += skipped
+        with self.lock:
+            self.finished = time.monotonic()
+        logger.info("Capture schedule finished (%s): %s", description, self.stats())
+
+    def _admit_frame(self):
+        """
+        Apply backpressure before a capture.
+
+        Returns:
+            tuple: (admitted, queue_depth), where admitted is False if the frame must be skipped.
+        """
+        depth = self.queue_depth()
+        if depth < self.max_depth:
+            return True, depth
+        if self.policy == "throttle":
+            with self.lock:
+                self.throttled += 1
+            return False, depth
+        while depth >= self.max_depth and self.drop_oldest and self.drop_oldest():
+            depth -= 1
+            with self.lock:
+                self.dropped += 1
+        if depth < self.max_depth:
+            return True, depth
+        # Nothing left to drop downstream, drop this frame instead
+        with self.lock:
+            self.dropped += 1
+        return False, depth
@@ -1,21 +1,151 @@
 import os
 import json
-import bcrypt
 import base64
+import contextlib
+import tempfile
 import logging
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 
 # Constants
 CONFIG_FILE = "config.json"
+CONFIG_VERSION = 2
+# n is the work factor: doubling it doubles unlock time and memory (128 * r * n bytes)
+DEFAULT_KDF = {"name": "scrypt", "n": 2 ** 15, "r": 8, "p": 1}
+LEGACY_KDF = {"name": "pbkdf2-sha256", "iterations": 100000}
+DEFAULT_SETTINGS = {
+    "upload_workers": 3,
+    "rate_limit_per_minute": 20,
+    "sequence_captions": False,
+    "album_window": 0.0,
+    "in_memory_uploads": False,
+    "encoder_format": "png",
+    "encoder_quality": 85,
+    "png_compress_level": 6,
+    "max_edge": 0,
+    "encoder_workers": 2,
+    "adaptive_quality": True,
+    "target_upload_latency": 5.0,
+    "full_fidelity": False,
+    "durable_queue": False,
+    "redrain_unsent": True,
+    "redrain_interval": 2.0,
+    "dedup_enabled": False,
+    "dedup_threshold": 3,
+    "dedup_history": 8,
+    "capture_mode": "full",
+    "capture_monitor": 0,
+    "capture_region": None,
+    "grab_backend": "auto",
+    "interval_seconds": 10.0,
+    "burst_frames": 5,
+    "burst_fps": 2.0,
+    "max_pending_frames": 20,
+    "backpressure_policy": "drop_oldest",
+    "metrics_port": 0,
+    "metrics_dump_path": "",
+    "metrics_dump_interval": 60.0,
+    "log_file": "app.log",
+    "log_level": "INFO",
+    "log_levels": {},
+    "log_max_bytes": 5 * 1024 * 1024,
+    "log_backups": 3,
+    "control_socket": "photel.sock",
+    "file_id_cache_size": 256,
+    "watch_directories": [],
+    "watch_settle_seconds": 1.0,
+    "watch_poll_interval": 2.0,
+    "replay_enabled": False,
+    "replay_seconds": 10.0,
+    "replay_fps": 2.0,
+    "replay_max_edge": 640,
+    "replay_format": "gif",
+    "replay_max_memory_mb": 32,
+    "replay_max_cpu_percent": 10,
+}
 logger = logging.getLogger(__name__)
 
+# (salt, kdf, key) of the unlocked configuration, so saving does not re-derive the key
+_cached_key = None
+
+
+def load_settings() -> dict:
+    """
+    Load the unencrypted application settings stored alongside the configuration.
+
+    Settings hold tuning options only, never secrets, so they are readable
+    without the password. Missing keys fall back to DEFAULT_SETTINGS.
+
+    Returns:
+        Settings as a dictionary.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    if not os.path.exists(CONFIG_FILE):
+        return settings
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            settings.update(json.load(f).get('settings', {}))
+    except (OSError, ValueError) as e:
+        logger.warning("Failed to read settings, using defaults: %s", e)
+    return settings
+
+
+def save_settings(settings: dict) -> None:
+    """
+    Save the unencrypted application settings without touching the encrypted data.
+
+    Args:
+        settings: Settings to store.
+
+    Raises:
+        RuntimeError: If saving the settings fails.
+    """
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            config = json.load(f)
+        config['settings'] = settings
+        _write_config_file(config)
+        logger.info("Settings saved successfully.")
+    except Exception as e:
+        logger.error("Failed to save settings: %s", e)
+        raise RuntimeError(f"Failed to save settings: {e}")
+
+
+def derive_key(password: str, salt: bytes, kdf: dict) -> bytes:
+    """
+    Derive the Fernet key for a password.
+
+    Args:
+        password: User-provided password.
+        salt: Random salt stored in the config file.
+        kdf: KDF name and parameters as stored in the config file.
+
+    Returns:
+        URL-safe base64-encoded 32-byte key.
+
+    Raises:
+        ValueError: If the KDF is not supported.
+    """
+    if kdf["name"] == "scrypt":
+        derivation = Scrypt(salt=salt, length=32, n=kdf["n"], r=kdf["r"], p=kdf["p"])
+    elif kdf["name"] == "pbkdf2-sha256":
+        derivation = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=kdf["iterations"])
+    else:
+        raise ValueError(f"Unsupported key derivation function: {kdf['name']}")
+    return base64.urlsafe_b64encode(derivation.derive(password.encode('utf-8')))
+
 
 def load_config(password: str) -> dict:
     """
     Load and decrypt the configuration from the config file.
 
+    Version 2 files derive one key from a single KDF and treat a failed Fernet
+    decryption as a wrong password. Version 1 files (bcrypt hash plus PBKDF2)
+    are decrypted the old way and rewritten as version 2. The derived key is
+    cached so save_config can re-encrypt without deriving it again.
+
     Args:
         password: User-provided password to decrypt the configuration.
 
@@ -26,6 +156,7 @@ def load_config(password: str) -> dict:
         FileNotFoundError: If the config file does not exist.
         ValueError: If the password is invalid or decryption fails.
     """
+    global _cached_key
     if not os.path.exists(CONFIG_FILE):
         logger.error("Configuration file not found.")
         raise FileNotFoundError("Configuration file not found.")
@@ -34,82 +165,140 @@ def load_config(password: str) -> dict:
         with open(CONFIG_FILE, 'r') as f:
             config = json.load(f)
 
-        hashed_pw = config.get('password_hash', '').encode('utf-8')
-        salt = base64.b64decode(config.get('salt', ''))
-        encrypted_data = config.get('encrypted_data', '').encode('utf-8')
+        if config.get('version', 1) == 1:
+            data = _load_legacy_config(config, password)
+            _write_config(data, _new_key(password))
+            logger.info("Configuration migrated to version %s.", CONFIG_VERSION)
+            return data
 
-        if not bcrypt.checkpw(password.encode('utf-8'), hashed_pw):
+        salt = base64.b64decode(config['salt'])
+        key = derive_key(password, salt, config['kdf'])
+        try:
+            decrypted_data = Fernet(key).decrypt(config['encrypted_data'].encode('utf-8')).decode('utf-8')
+        except InvalidToken:
             logger.warning("Password verification failed.")
             raise ValueError("Invalid password.")
-
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
-        fernet = Fernet(key)
-        decrypted_data = fernet.decrypt(encrypted_data).decode('utf-8')
+        _cached_key = (salt, config['kdf'], key)
         logger.info("Configuration loaded and decrypted successfully.")
         return json.loads(decrypted_data)
 
     except ValueError as e:
-        logger.error(f"Failed to load configuration: {e}")
+        logger.error("Failed to load configuration: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error loading configuration: {e}")
+        logger.error("Unexpected error loading configuration: %s", e)
         raise ValueError(f"Failed to load configuration: {e}")
 
 
-def save_config(api_token: str, channel_id: str, save_path: str, password: str) -> None:
+def parse_channel_ids(channel_id) -> list:
+    """
+    Normalize the configured channel ID into a list.
+
+    Args:
+        channel_id: A single ID, e.g. a numeric one, a comma-separated string of IDs,
+            or a list of IDs.
+
+    Returns:
+        list: Channel IDs as strings, in configured order.
+    """
+    if isinstance(channel_id, str):
+        values = channel_id.split(",")
+    elif isinstance(channel_id, (list, tuple, set)):
+        values = channel_id
+    else:
+        values = [channel_id]
+    return [str(value).strip() for value in values if str(value).strip()]
+
+
+def save_config(api_token: str, channel_id, save_path: str, password: str = None) -> None:
     """
     Save and encrypt the configuration to the config file.
 
     Args:
         api_token: Telegram API token.
-        channel_id: Telegram channel ID.
+        channel_id: Telegram channel ID, or several as a list or comma-separated string.
         save_path: File path for saving screenshots.
-        password: User-provided password to encrypt the configuration.
+        password: User-provided password to encrypt the configuration. If omitted,
+            the key cached by the last load_config or save_config is reused.
 
     Raises:
         RuntimeError: If saving the configuration fails.
     """
     try:
-        salt = os.urandom(16)
-        hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        logger.debug(f"Type of hashed_pw: {type(hashed_pw)}, Value: {hashed_pw}")
-
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
-        fernet = Fernet(key)
-
+        if password is not None:
+            key = _new_key(password)
+        elif _cached_key is not None:
+            key = _cached_key
+        else:
+            raise RuntimeError("No password given and no unlocked configuration to reuse.")
         config_data = {
             "api_token": api_token,
             "channel_id": channel_id,
             "save_path": save_path
         }
-        encrypted_data = fernet.encrypt(json.dumps(config_data).encode('utf-8'))
+        _write_config(config_data, key)
+        logger.info("Configuration saved and encrypted successfully.")
 
-        # Ensure hashed_pw is a string for JSON serialization
-        password_hash = hashed_pw.decode('utf-8') if isinstance(hashed_pw, bytes) else hashed_pw
+    except Exception as e:
+        logger.error("Failed to save configuration: %s", e)
+        raise RuntimeError(f"Failed to save configuration: {e}")
 
-        config = {
-            "password_hash": password_hash,
-            "salt": base64.b64encode(salt).decode('utf-8'),
-            "encrypted_data": encrypted_data.decode('utf-8')
-        }
 
-        with open(CONFIG_FILE, 'w') as f:
+def _new_key(password: str) -> tuple:
+    """Derive a key with a fresh salt and the default KDF, and cache it."""
+    global _cached_key
+    salt = os.urandom(16)
+    kdf = dict(DEFAULT_KDF)
+    _cached_key = (salt, kdf, derive_key(password, salt, kdf))
+    return _cached_key
+
+
+def _write_config(config_data: dict, key: tuple) -> None:
+    """Encrypt the configuration with a (salt, kdf, key) tuple and write a version 2 file."""
+    salt, kdf, fernet_key = key
+    encrypted_data = Fernet(fernet_key).encrypt(json.dumps(config_data).encode('utf-8'))
+    config = {
+        "version": CONFIG_VERSION,
+        "kdf": kdf,
+        "salt": base64.b64encode(salt).decode('utf-8'),
+        "encrypted_data": encrypted_data.decode('utf-8'),
+        "settings": load_settings()
+    }
+    _write_config_file(config)
+
+
+def _write_config_file(config: dict) -> None:
+    """
+    Replace the config file atomically, so a crash mid-write cannot leave it truncated.
+
+    The JSON goes to a temporary file in the same directory, is synced to disk
+    and then renamed over CONFIG_FILE.
+    """
+    directory = os.path.dirname(os.path.abspath(CONFIG_FILE))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".config.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
             json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, CONFIG_FILE)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
 
-        logger.info("Configuration saved and encrypted successfully.")
 
-    except Exception as e:
-        logger.error(f"Failed to save configuration: {e}")
-        raise RuntimeError(f"Failed to save configuration: {e}")
+def _load_legacy_config(config: dict, password: str) -> dict:
+    """Decrypt a version 1 config file (bcrypt password hash plus PBKDF2 key)."""
+    import bcrypt  # Only version 1 files need it
+
+    hashed_pw = config.get('password_hash', '').encode('utf-8')
+    salt = base64.b64decode(config.get('salt', ''))
+    encrypted_data = config.get('encrypted_data', '').encode('utf-8')
+
+    if not bcrypt.checkpw(password.encode('utf-8'), hashed_pw):
+        logger.warning("Password verification failed.")
+        raise ValueError("Invalid password.")
+
+    key = derive_key(password, salt, LEGACY_KDF)
+    return json.loads(Fernet(key).decrypt(encrypted_data).decode('utf-8'))
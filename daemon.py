@@ -0,0 +1,211 @@
+import os
+import json
+import stat
+import errno
+import signal
+import socket
+import threading
+import socketserver
+from config_manager import load_config, load_settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_ENV = "PHOTEL_PASSWORD"
+KEYRING_SERVICE = "photel"
+KEYRING_USERNAME = "config"
+CONTROL_COMMANDS = ("capture", "replay", "send-text", "set-region", "status", "metrics")
+
+
+def get_password() -> str:
+    """
+    Find the configuration password without prompting.
+
+    The PHOTEL_PASSWORD environment variable is checked first, then the system
+    keyring if the optional keyring package is installed.
+
+    Returns:
+        str: The password.
+
+    Raises:
+        RuntimeError: If no password is available.
+    """
+    password = os.environ.get(PASSWORD_ENV)
+    if password:
+        return password
+    try:
+        import keyring
+    except ImportError:
+        keyring = None
+    if keyring:
+        password = keyring.get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+        if password:
+            return password
+    raise RuntimeError(
+        f"No password found. Set {PASSWORD_ENV} or store it with "
+        f"keyring.set_password('{KEYRING_SERVICE}', '{KEYRING_USERNAME}', ...)."
+    )
+
+
+def remove_stale_socket(socket_path: str) -> None:
+    """
+    Remove a socket left behind by a daemon that is no longer running.
+
+    Args:
+        socket_path: Path of the control socket.
+
+    Raises:
+        RuntimeError: If the path is not a socket or a daemon still accepts connections on it.
+    """
+    if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+        raise RuntimeError(f"{socket_path} exists and is not a socket; check the control_socket setting.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError as e:
+            if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+                raise
+            os.remove(socket_path)
+            logger.info("Removed stale control socket: %s", socket_path)
+            return
+    raise RuntimeError(f"Another Photel daemon is already listening on {socket_path}")
+
+
+class ControlServer:
+    def __init__(self, pipeline, socket_path: str):
+        """
+        Accept control commands for a capture pipeline on a local Unix socket.
+
+        Each request is one JSON object per line, e.g. {"command": "capture",
+        "caption": "..."}; each response is one JSON object with "ok" and
+        either "result" or "error". The socket is only accessible by its owner.
+
+        Args:
+            pipeline: Started CapturePipeline to control.
+            socket_path: Filesystem path of the socket.
+
+        Raises:
+            RuntimeError: If the path is taken by another running daemon or by
+                something other than a socket.
+        """
+        self.pipeline = pipeline
+        self.socket_path = socket_path
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(handler):
+                for line in handler.rfile:
+                    if not line.strip():
+                        continue
+                    response = server.dispatch(line)
+                    handler.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+        if os.path.lexists(socket_path):
+            remove_stale_socket(socket_path)
+        self.server = socketserver.ThreadingUnixStreamServer(socket_path, Handler, bind_and_activate=False)
+        try:
+            self.server.server_bind()
+            # Restrict access before listening; changing the umask would affect files other threads create
+            os.chmod(socket_path, 0o600)
+            self.server.server_activate()
+        except OSError:
+            self.server.server_close()
+            raise
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="ControlServer")
+        self.thread.start()
+        logger.info("Control socket listening on %s", socket_path)
+
+    def dispatch(self, line: bytes) -> dict:
+        """
+        Run one control command.
+
+        Args:
+            line: JSON-encoded request.
+
+        Returns:
+            dict: The response.
+        """
+        try:
+            request = json.loads(line)
+            command = request.get("command")
+            if command == "capture":
+                result = self.pipeline.capture(request.get("caption"))
+            elif command == "replay":
+                result = self.pipeline.save_replay(request.get("caption")).result()
+            elif command == "send-text":
+                text = (request.get("text") or "").strip()
+                if not text:
+                    raise ValueError("Message cannot be empty")
+                self.pipeline.send_text(text)
+                result = "queued"
+            elif command == "set-region":
+                result = self.pipeline.set_capture_region(request.get("region"))
+            elif command == "status":
+                result = self.pipeline.status()
+            elif command == "metrics":
+                from metrics import REGISTRY
+                result = REGISTRY.render_prometheus()
+            else:
+                raise ValueError(f"Unknown command: {command}. Expected one of {', '.join(CONTROL_COMMANDS)}")
+        except Exception as e:
+            logger.warning("Control command failed: %s", e)
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result}
+
+    def stop(self) -> None:
+        """Close the socket and remove its file."""
+        self.server.shutdown()
+        self.server.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def send_command(socket_path: str, command: str, timeout: float = 10.0, **params) -> dict:
+    """
+    Send one command to a running daemon.
+
+    Args:
+        socket_path: Path of the daemon's control socket.
+        command: One of CONTROL_COMMANDS.
+        timeout: Seconds to wait for the response.
+        **params: Command parameters, e.g. caption or text.
+
+    Returns:
+        dict: The daemon's response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(dict(params, command=command)).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as response:
+            return json.loads(response.readline())
+
+
+def run_daemon(socket_path: str = None) -> None:
+    """
+    Unlock the configuration and run the capture pipeline without a window until SIGINT or SIGTERM.
+
+    Args:
+        socket_path: Control socket path; the control_socket setting if omitted.
+    """
+    from capture_pipeline import CapturePipeline
+
+    config = load_config(get_password())
+    settings = load_settings()
+    pipeline = CapturePipeline(config["api_token"], config["channel_id"], config["save_path"], settings)
+    pipeline.start()
+    try:
+        control = ControlServer(pipeline, socket_path or settings["control_socket"])
+    except Exception:
+        pipeline.stop()
+        raise
+
+    stop_event = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop_event.set())
+    logger.info("Photel daemon running.")
+    stop_event.wait()
+    logger.info("Stopping Photel daemon.")
+    control.stop()
+    pipeline.stop()
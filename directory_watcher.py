@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+WATCH_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    def __init__(self, directories: list):
+        """
+        Minimal ctypes binding for Linux inotify, watching directories for new files.
+
+        Args:
+            directories: Directories to watch, non-recursively.
+
+        Raises:
+            OSError: If inotify is unavailable or a watch cannot be added.
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        try:
+            for directory in directories:
+                wd = self.libc.inotify_add_watch(
+                    self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+                )
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+                self.directories[wd] = directory
+        except OSError:
+            self.close()
+            raise
+
+    def read(self, timeout: float):
+        """
+        Wait for events.
+
+        Args:
+            timeout: Seconds to wait for the first event.
+
+        Returns:
+            tuple: (paths of created or written files, True if the kernel queue overflowed).
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return [], False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        paths, overflow, offset = [], False, 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name and wd in self.directories:
+                paths.append(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return paths, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class SentIndex:
+    def __init__(self, path: str):
+        """
+        Persistent record of files already handed to the uploader.
+
+        Entries are (path, size, mtime_ns), so a file replaced with new content
+        is sent again. The index is an append-only file of JSON lines, compacted
+        on load by dropping files that no longer exist or have changed.
+
+        Args:
+            path: Index file location.
+        """
+        self.path = path
+        self.entries = set()
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.entries.add(tuple(json.loads(line)))
+                    except (ValueError, TypeError):
+                        logger.warning("Skipping corrupt line in sent index %s", path)
+            self.entries = {entry for entry in self.entries if file_key(entry[0]) == entry}
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(list(entry)) + "\n" for entry in self.entries)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key: tuple) -> bool:
+        with self.lock:
+            return key in self.entries
+
+    def add(self, key: tuple) -> None:
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries.add(key)
+            self.file.write(json.dumps(list(key)) + "\n")
+            self.file.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+
+
+def file_key(path: str):
+    """
+    Returns:
+        (path, size, mtime_ns) of a file, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+class DirectoryWatcher:
+    def __init__(self, uploader, directories: list, index_path: str, settle_seconds: float = 1.0,
+                 poll_interval: float = 2.0, extensions: tuple = WATCH_EXTENSIONS):
+        """
+        Upload images that other tools drop into watched directories.
+
+        A bulk os.scandir pass picks up files present at startup; afterwards
+        inotify reports new files, or directories are rescanned every
+        poll_interval where inotify is unavailable. A file is only queued once
+        its size and mtime have stayed the same for settle_seconds, so partially
+        written files are never sent. Watched files are never deleted or moved.
+
+        Args:
+            uploader: TelegramScreenshotUploader to feed.
+            directories: Directories to watch, non-recursively.
+            index_path: File recording what was already sent, kept across restarts.
+            settle_seconds: Time a file must stay unchanged before it is queued.
+            poll_interval: Seconds between rescans without inotify.
+            extensions: Lower-case file extensions to pick up.
+        """
+        self.uploader = uploader
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.extensions = extensions
+        self.index = SentIndex(index_path)
+        # path -> ((size, mtime_ns), monotonic time it was first seen with that signature)
+        self.candidates = {}
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.stop_event = threading.Event()
+        try:
+            self.inotify = Inotify(self.directories)
+        except OSError as e:
+            logger.info("inotify unavailable, polling watched directories every %ss: %s", poll_interval, e)
+            self.inotify = None
+        self.thread = threading.Thread(target=self._run, daemon=True, name="DirectoryWatcher")
+        self.thread.start()
+        logger.info("Watching %s for new images.", ", ".join(self.directories))
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Watched directories, backend, files queued so far and files waiting to settle.
+        """
+        with self.lock:
+            return {
+                "directories": self.directories,
+                "backend": "inotify" if self.inotify else "polling",
+                "queued": self.queued,
+                "settling": len(self.candidates),
+                "in_flight": len(self.in_flight),
+            }
+
+    def stop(self) -> None:
+        """Stop watching."""
+        self.stop_event.set()
+        self.thread.join()
+        if self.inotify:
+            self.inotify.close()
+        self.index.close()
+
+    def _run(self) -> None:
+        self._scan()
+        last_scan = time.monotonic()
+        while not self.stop_event.is_set():
+            # Wake up often enough to notice files settling
+            timeout = self.settle_seconds / 2 if self.candidates else self.poll_interval
+            try:
+                if self.inotify:
+                    paths, overflow = self.inotify.read(min(timeout, 1.0))
+                    for path in paths:
+                        self._track(path)
+                    if overflow:
+                        logger.warning("inotify queue overflowed, rescanning watched directories.")
+                        self._scan()
+                else:
+                    self.stop_event.wait(timeout)
+                    if time.monotonic() - last_scan >= self.poll_interval:
+                        self._scan()
+                        last_scan = time.monotonic()
+                self._check_candidates()
+            except Exception as e:
+                logger.error("Unexpected error watching directories: %s", e)
+                self.stop_event.wait(self.poll_interval)
+
+    def _scan(self) -> None:
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.lower().endswith(self.extensions):
+                            self._track(entry.path)
+            except OSError as e:
+                logger.warning("Cannot scan watched directory %s: %s", directory, e)
+
+    def _track(self, path: str) -> None:
+        if not path.lower().endswith(self.extensions):
+            return
+        with self.lock:
+            if path not in self.candidates and path not in self.in_flight:
+                self.candidates[path] = None
+
+    def _check_candidates(self) -> None:
+        now = time.monotonic()
+        with self.lock:
+            candidates = list(self.candidates.items())
+        for path, state in candidates:
+            key = file_key(path)
+            if key is None or key in self.index:
+                with self.lock:
+                    self.candidates.pop(path, None)
+                continue
+            signature = key[1:]
+            if state is None and time.time() - key[2] / 1e9 >= self.settle_seconds and key[1] > 0:
+                settled = True  # Untouched for long enough already, e.g. found by the startup scan
+            elif state is None or state[0] != signature:
+                with self.lock:
+                    self.candidates[path] = (signature, now)
+                continue
+            else:
+                settled = key[1] > 0 and now - state[1] >= self.settle_seconds
+            if settled:
+                self._enqueue(path, key)
+
+    def _enqueue(self, path: str, key: tuple) -> None:
+        with self.lock:
+            self.candidates.pop(path, None)
+            self.in_flight.add(path)
+            self.queued += 1
+        self.uploader.enqueue_screenshot(
+            path,
+            on_complete=lambda success: self._on_complete(path, key, success),
+            keep_file=True,
+            # A copy in the unsent backlog is re-sent from there
+            on_unsent=lambda unsent_path: self.index.add(key)
+        )
+
+    def _on_complete(self, path: str, key: tuple, success: bool) -> None:
+        with self.lock:
+            self.in_flight.discard(path)
+        # Files neither sent nor copied to unsent stay unindexed, so the next scan picks them up again
+        if success:
+            self.index.add(key)
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ITU-R BT.601 luma weights, as used by PIL's "L" conversion
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def difference_hash(image: Image.Image, hash_size: int = 16) -> int:
+    """
+    Compute a difference hash (dHash) of an image.
+
+    The image is box-downscaled to (hash_size + 1) x hash_size in one pass, turned
+    into grayscale with NumPy, and each bit records whether a pixel is brighter
+    than its right-hand neighbour.
+
+    Args:
+        image: Image to hash.
+        hash_size: Number of rows and comparisons per row; the hash has hash_size ** 2 bits.
+
+    Returns:
+        int: The hash as an integer.
+    """
+    small = image.resize((hash_size + 1, hash_size), Image.BOX)
+    if small.mode != "RGB":
+        small = small.convert("RGB")
+    gray = np.asarray(small, dtype=np.float32) @ LUMA_WEIGHTS
+    bits = np.packbits(gray[:, 1:] > gray[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class FrameDeduplicator:
+    def __init__(self, threshold: int = 3, history: int = 8, hash_size: int = 16):
+        """
+        Initialize the near-duplicate frame detector.
+
+        Args:
+            threshold: Frames whose hash differs from a recent frame in fewer than
+                this many bits are treated as duplicates.
+            history: Number of recent frame hashes to remember.
+            hash_size: Hash resolution, see difference_hash.
+        """
+        self.threshold = threshold
+        self.history = history
+        self.hash_size = hash_size
+        self.recent = OrderedDict()  # hash -> encoded size in bytes, or None if not known yet
+        self.lock = threading.Lock()
+        self.skipped = 0
+        self.bytes_saved = 0
+
+    def check(self, image: Image.Image):
+        """
+        Hash a frame and compare it with recent frames.
+
+        Unique frames are added to the history; duplicates refresh the matching entry.
+
+        Args:
+            image: Captured frame.
+
+        Returns:
+            tuple: (is_duplicate, frame_hash).
+        """
+        frame_hash = difference_hash(image, self.hash_size)
+        with self.lock:
+            for known_hash, size in self.recent.items():
+                if bin(frame_hash ^ known_hash).count("1") < self.threshold:
+                    self.recent.move_to_end(known_hash)
+                    self.skipped += 1
+                    self.bytes_saved += size or 0
+                    logger.info("Skipping duplicate frame (%s skipped so far)", self.skipped)
+                    return True, known_hash
+            self.recent[frame_hash] = None
+            if len(self.recent) > self.history:
+                self.recent.popitem(last=False)
+        return False, frame_hash
+
+    def record_size(self, frame_hash: int, size: int) -> None:
+        """
+        Remember the encoded size of a frame so skipped duplicates count towards bytes saved.
+
+        Args:
+            frame_hash: Hash returned by check.
+            size: Encoded size in bytes.
+        """
+        with self.lock:
+            if frame_hash in self.recent:
+                self.recent[frame_hash] = size
+
+    def stats(self) -> dict:
+        """
+        Report how much work deduplication saved.
+
+        Returns:
+            dict: Number of skipped uploads and encoded bytes saved.
+        """
+        with self.lock:
+            return {"skipped_uploads": self.skipped, "bytes_saved": self.bytes_saved}
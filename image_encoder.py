@@ -0,0 +1,213 @@
+import io
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from PIL import Image
+from metrics import REGISTRY as metrics
+from adaptive_quality import AdaptiveQuality
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Supported output formats: name -> (PIL format, file extension)
+ENCODER_FORMATS = {
+    "png": ("PNG", ".png"),
+    "jpeg": ("JPEG", ".jpg"),
+    "webp": ("WEBP", ".webp"),
+}
+
+
+class EncodedImage:
+    def __init__(self, filename: str, size: int, encode_time: float, buffer: io.BytesIO = None,
+                 path: str = None, width: int = None, height: int = None):
+        """
+        Result of encoding one screenshot.
+
+        Args:
+            filename: File name including the extension of the chosen format.
+            size: Encoded size in bytes.
+            encode_time: Seconds spent resizing and encoding.
+            buffer: In-memory encoded image, if no target path was given.
+            path: File the image was written to, if a target path was given.
+            width: Encoded width in pixels.
+            height: Encoded height in pixels.
+        """
+        self.filename = filename
+        self.size = size
+        self.encode_time = encode_time
+        self.buffer = buffer
+        self.path = path
+        self.width = width
+        self.height = height
+
+
+class ImageEncoder:
+    def __init__(self, image_format: str = "png", quality: int = 85, compress_level: int = 6,
+                 max_edge: int = 0, max_workers: int = 2, quality_policy: AdaptiveQuality = None):
+        """
+        Initialize the image encoder stage.
+
+        Args:
+            image_format: Output format, one of ENCODER_FORMATS.
+            quality: JPEG/WebP quality from 1 to 100.
+            compress_level: PNG zlib compression level from 0 (fastest) to 9 (smallest).
+            max_edge: Downscale images so their longest edge fits this many pixels. 0 disables.
+            max_workers: Number of encoder threads.
+            quality_policy: Optional policy fitting each image into a byte budget derived
+                from the measured upload bandwidth.
+
+        Raises:
+            ValueError: If the image format is not supported.
+        """
+        if image_format not in ENCODER_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.image_format = image_format
+        self.quality = quality
+        self.compress_level = compress_level
+        self.max_edge = max_edge
+        self.quality_policy = quality_policy
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ImageEncoder")
+        self.stats_lock = threading.Lock()
+        self.encoded_count = 0
+        self.total_encode_time = 0.0
+        self.total_bytes = 0
+        self.pending_count = 0
+        metrics.register_gauge("encode_queue_depth", self.pending)
+        logger.info("ImageEncoder initialized: %s, max edge %s.", image_format, max_edge or 'unlimited')
+
+    @property
+    def extension(self) -> str:
+        return ENCODER_FORMATS[self.image_format][1]
+
+    def encode(self, image: Image.Image, stem: str, target_path: str = None) -> EncodedImage:
+        """
+        Downscale and encode an image on the calling thread.
+
+        With a quality policy, an image larger than the policy's byte budget is
+        re-encoded at a lower quality or resolution until it fits.
+
+        Args:
+            image: Captured image. It may be downscaled in place.
+            stem: File name without extension.
+            target_path: Directory to write the file to. Encodes into memory if omitted.
+
+        Returns:
+            EncodedImage: The encoded image and its encode statistics.
+        """
+        start = time.perf_counter()
+        if self.max_edge and max(image.size) > self.max_edge:
+            image.thumbnail((self.max_edge, self.max_edge))
+        pil_format = ENCODER_FORMATS[self.image_format][0]
+        lossy = pil_format != "PNG"
+        if lossy and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        filename = stem + self.extension
+        policy = self.quality_policy
+        budget = policy.byte_budget() if policy else None
+        quality = self.quality
+        scale = policy.initial_scale(*image.size) if policy else 1.0
+        source = image
+        for attempt in range(policy.max_attempts if policy else 1):
+            if scale < 1.0:
+                image = source.resize(
+                    (max(1, int(source.width * scale)), max(1, int(source.height * scale))), Image.LANCZOS
+                )
+            buffer = io.BytesIO()
+            buffer.name = filename
+            if lossy:
+                image.save(buffer, format=pil_format, quality=quality)
+            else:
+                image.save(buffer, format=pil_format, compress_level=self.compress_level)
+            size = buffer.tell()
+            if budget is None or size <= budget:
+                break
+            step = policy.adjust(quality, scale, size, budget, lossy)
+            if step is None:
+                logger.warning("%s is %s bytes, still over the %s byte budget", filename, size, budget)
+                break
+            quality, scale = step
+            metrics.inc("adaptive_reencodes_total")
+
+        path = None
+        if target_path:
+            path = os.path.join(target_path, filename)
+            with open(path, "wb") as f:
+                f.write(buffer.getbuffer())
+            buffer = None
+        encode_time = time.perf_counter() - start
+
+        with self.stats_lock:
+            self.encoded_count += 1
+            self.total_encode_time += encode_time
+            self.total_bytes += size
+        metrics.observe("encode_seconds", encode_time)
+        metrics.inc("encoded_bytes_total", size)
+        logger.info("Encoded %s: %sx%s in %.1f ms, %s bytes",
+                    filename, image.size[0], image.size[1], encode_time * 1000, size)
+        return EncodedImage(filename, size, encode_time, buffer=buffer, path=path,
+                            width=image.size[0], height=image.size[1])
+
+    def submit(self, image: Image.Image, stem: str, callback, target_path: str = None) -> Future:
+        """
+        Encode an image on the encoder thread pool.
+
+        Args:
+            image: Captured image.
+            stem: File name without extension.
+            callback: Called with the EncodedImage once encoding succeeds.
+            target_path: Directory to write the file to. Encodes into memory if omitted.
+
+        Returns:
+            Future: Future resolving to the EncodedImage.
+        """
+        def run():
+            encoded = self.encode(image, stem, target_path)
+            callback(encoded)
+            return encoded
+
+        with self.stats_lock:
+            self.pending_count += 1
+        future = self.executor.submit(run)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def pending(self) -> int:
+        """
+        Count images submitted but not encoded yet.
+
+        Returns:
+            int: Number of pending images.
+        """
+        with self.stats_lock:
+            return self.pending_count
+
+    def stats(self) -> dict:
+        """
+        Summarize encode performance so far.
+
+        Returns:
+            dict: Image count, total and average encode time in ms, total and average bytes.
+        """
+        with self.stats_lock:
+            count = self.encoded_count
+            return {
+                "images": count,
+                "total_encode_ms": self.total_encode_time * 1000,
+                "avg_encode_ms": self.total_encode_time * 1000 / count if count else 0.0,
+                "total_bytes": self.total_bytes,
+                "avg_bytes": self.total_bytes / count if count else 0,
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting new images and wait for pending encodes."""
+        self.executor.shutdown(wait=True)
+        logger.info("ImageEncoder stopped: %s", self.stats())
+
+    def _on_done(self, future: Future) -> None:
+        with self.stats_lock:
+            self.pending_count -= 1
+        error = future.exception()
+        if error is not None:
+            logger.error("Failed to encode screenshot: %s", error)
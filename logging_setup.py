@@ -0,0 +1,81 @@
+import os
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
+# Per-module levels, e.g. "telegram_uploader=WARNING,utils=WARNING". A bare level sets the root level.
+LOG_LEVELS_ENV = "PHOTEL_LOG_LEVELS"
+
+
+class _DeferredQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Pass the record through unformatted.
+
+        The stock QueueHandler merges the message and its arguments on the
+        logging thread. The queue never leaves the process, so formatting is
+        left to the listener thread instead.
+        """
+        return record
+
+
+def parse_log_levels(spec: str) -> dict:
+    """
+    Parse a level specification such as "INFO,telegram_uploader=WARNING".
+
+    Args:
+        spec: Comma-separated logger=LEVEL pairs. An entry without a logger name
+            applies to the root logger.
+
+    Returns:
+        dict: Logger name ("" for root) to level name.
+    """
+    levels = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = entry.rpartition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_file: str = "app.log", level: str = "INFO", module_levels: dict = None,
+                  max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3) -> QueueListener:
+    """
+    Route all logging through a queue so logging threads never wait on disk or console I/O.
+
+    Records are put on an in-memory queue by the calling thread; a single
+    listener thread formats them and writes them to a size-rotated file and
+    the console.
+
+    Args:
+        log_file: Path of the log file.
+        level: Root log level.
+        module_levels: Logger name to level overrides, e.g. {"telegram_uploader": "WARNING"}.
+            Entries from the PHOTEL_LOG_LEVELS environment variable take precedence.
+        max_bytes: Size at which the log file is rotated.
+        backup_count: Number of rotated files to keep.
+
+    Returns:
+        QueueListener: The started listener. Stop it on exit to flush pending records.
+    """
+    levels = {"": level}
+    levels.update(module_levels or {})
+    levels.update(parse_log_levels(os.environ.get(LOG_LEVELS_ENV, "")))
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    for name, name_level in levels.items():
+        logging.getLogger(name or None).setLevel(name_level)
+
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -1,16 +1,77 @@
+import sys
+import json
+import argparse
 import logging
-from ui import DraggableApp
+from config_manager import load_settings
+from logging_setup import setup_logging
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Capture screenshots and send them to a Telegram channel.")
+    subparsers = parser.add_subparsers(dest="mode")
+    subparsers.add_parser("gui", help="run with a window (default)")
+    daemon = subparsers.add_parser("daemon", help="run headless, unlocking with PHOTEL_PASSWORD or the keyring")
+    daemon.add_argument("--socket", help="control socket path, overrides the control_socket setting")
+    ctl = subparsers.add_parser("ctl", help="send a command to a running daemon")
+    ctl.add_argument("command", choices=["capture", "replay", "send-text", "set-region", "status", "metrics"])
+    ctl.add_argument("text", nargs="?", help="message text for send-text, or LEFT,TOP,RIGHT,BOTTOM for "
+                     "set-region; omit it to clear the region, put -- before negative coordinates")
+    ctl.add_argument("--caption", help="caption for capture or replay")
+    ctl.add_argument("--socket", help="control socket path, overrides the control_socket setting")
+    return parser.parse_args(argv)
+
+
+def run_ctl(args, settings: dict) -> int:
+    from daemon import send_command
+
+    params = {"caption": args.caption} if args.command in ("capture", "replay") else {}
+    if args.command == "send-text":
+        params["text"] = args.text
+    elif args.command == "set-region":
+        params["region"] = args.text
+    socket_path = args.socket or settings["control_socket"]
+    try:
+        response = send_command(socket_path, args.command, **params)
+    except OSError as e:
+        print(f"Cannot reach the Photel daemon at {socket_path}: {e}", file=sys.stderr)
+        return 1
+    if not response["ok"]:
+        print(response["error"], file=sys.stderr)
+        return 1
+    result = response["result"]
+    print(result if isinstance(result, str) else json.dumps(result, indent=4))
+    return 0
+
 
 if __name__ == "__main__":
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("app.log", mode='a', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
+    args = parse_args()
+    settings = load_settings()
+    if args.mode == "ctl":
+        sys.exit(run_ctl(args, settings))
+
+    listener = setup_logging(
+        log_file=settings["log_file"],
+        level=settings["log_level"],
+        module_levels=settings["log_levels"],
+        max_bytes=settings["log_max_bytes"],
+        backup_count=settings["log_backups"]
     )
     logger = logging.getLogger(__name__)
-    logger.info("Starting Photel application.")
-    app = DraggableApp()
-    app.mainloop()
+    try:
+        if args.mode == "daemon":
+            # Imported here so headless runs never load the GUI toolkit or the hotkey hook
+            from daemon import run_daemon
+            logger.info("Starting Photel daemon.")
+            run_daemon(args.socket)
+        else:
+            from ui import DraggableApp
+            logger.info("Starting Photel application.")
+            app = DraggableApp()
+            try:
+                app.mainloop()
+            finally:
+                # After the window is gone, so joining upload workers cannot block the Tk thread
+                if app.pipeline:
+                    app.pipeline.stop()
+    finally:
+        listener.stop()
@@ -0,0 +1,268 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "photel_"
+EXPORTED_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Histogram:
+    # Each power-of-two range of microseconds is split into 2 ** SUB_BUCKET_BITS linear
+    # buckets, as in HdrHistogram, bounding the relative error to about 6%.
+    SUB_BUCKET_BITS = 4
+
+    def __init__(self):
+        """Initialize an empty latency histogram recording values in seconds."""
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """
+        Record one value.
+
+        Args:
+            seconds: Value to record, e.g. a stage latency.
+        """
+        index = self._index(max(0, int(seconds * 1_000_000)))
+        with self.lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += seconds
+            self.min = seconds if self.min is None else min(self.min, seconds)
+            self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, quantile: float) -> float:
+        """
+        Estimate a quantile.
+
+        Args:
+            quantile: Quantile between 0 and 1.
+
+        Returns:
+            float: Upper bound in seconds of the bucket holding the quantile, 0.0 if empty.
+        """
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, int(round(quantile * self.count)))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= rank:
+                    return min(self._upper_bound(index) / 1_000_000, self.max)
+            return self.max
+
+    def snapshot(self) -> dict:
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: Count, sum, min, max and the exported quantiles in seconds.
+        """
+        summary = {f"p{quantile * 100:g}": self.percentile(quantile) for quantile in EXPORTED_QUANTILES}
+        with self.lock:
+            summary.update(count=self.count, sum=self.total, min=self.min or 0.0, max=self.max or 0.0)
+        return summary
+
+    @classmethod
+    def _index(cls, micros: int) -> int:
+        linear = 1 << (cls.SUB_BUCKET_BITS + 1)
+        if micros < linear:
+            return micros
+        shift = micros.bit_length() - (cls.SUB_BUCKET_BITS + 1)
+        sub_buckets = 1 << cls.SUB_BUCKET_BITS
+        return linear + (shift - 1) * sub_buckets + (micros >> shift) - sub_buckets
+
+    @classmethod
+    def _upper_bound(cls, index: int) -> int:
+        linear = 1 << (cls.SUB_BUCKET_BITS + 1)
+        if index < linear:
+            return index
+        sub_buckets = 1 << cls.SUB_BUCKET_BITS
+        shift = (index - linear) // sub_buckets + 1
+        top = (index - linear) % sub_buckets + sub_buckets
+        return ((top + 1) << shift) - 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Initialize an empty registry of counters, gauges and histograms."""
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """
+        Increase a counter.
+
+        Args:
+            name: Counter name, conventionally ending in _total.
+            value: Amount to add.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Record a latency in a histogram, creating it on first use.
+
+        Args:
+            name: Histogram name, conventionally ending in _seconds.
+            seconds: Latency to record.
+        """
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+        histogram.record(seconds)
+
+    def register_gauge(self, name: str, func) -> None:
+        """
+        Register a gauge whose value is read when metrics are exported.
+
+        Args:
+            name: Gauge name.
+            func: Callable returning the current value.
+        """
+        with self.lock:
+            self.gauges[name] = func
+
+    def reset(self) -> None:
+        """Clear all counters and histograms. Registered gauges are kept."""
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Collect the current value of every metric.
+
+        Returns:
+            dict: Counters, gauges and histogram summaries keyed by name.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = dict(self.histograms)
+        gauge_values = {}
+        for name, func in gauges.items():
+            try:
+                gauge_values[name] = func()
+            except Exception as e:
+                logger.warning("Failed to read gauge %s: %s", name, e)
+        return {
+            "timestamp": time.time(),
+            "counters": counters,
+            "gauges": gauge_values,
+            "histograms": {name: histogram.snapshot() for name, histogram in histograms.items()},
+        }
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Histograms are exported as summaries with precomputed quantiles.
+
+        Returns:
+            str: The exposition text.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {METRIC_PREFIX}{name} counter", f"{METRIC_PREFIX}{name} {value}"]
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines += [f"# TYPE {METRIC_PREFIX}{name} gauge", f"{METRIC_PREFIX}{name} {value}"]
+        for name, summary in sorted(snapshot["histograms"].items()):
+            metric = METRIC_PREFIX + name
+            lines.append(f"# TYPE {metric} summary")
+            for quantile in EXPORTED_QUANTILES:
+                lines.append(f'{metric}{{quantile="{quantile}"}} {summary[f"p{quantile * 100:g}"]}')
+            lines += [f"{metric}_sum {summary['sum']}", f"{metric}_count {summary['count']}"]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the capture and upload pipeline
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry = REGISTRY, port: int = 9464, host: str = "127.0.0.1"):
+        """
+        Serve metrics in the Prometheus text format on a local HTTP endpoint.
+
+        Args:
+            registry: Registry to export.
+            port: TCP port to listen on.
+            host: Interface to bind; localhost by default so metrics are not exposed.
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] not in ("/", "/metrics"):
+                    handler.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                logger.debug("Metrics request: " + format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="MetricsServer")
+        self.thread.start()
+        logger.info("Metrics endpoint listening on http://%s:%s/metrics", host, self.server.server_port)
+
+    def stop(self) -> None:
+        """Shut the endpoint down."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsDumper:
+    def __init__(self, path: str, interval: float = 60.0, registry: MetricsRegistry = REGISTRY):
+        """
+        Periodically write a JSON snapshot of all metrics to a file.
+
+        Args:
+            path: JSON file to overwrite with each snapshot.
+            interval: Seconds between snapshots.
+            registry: Registry to dump.
+        """
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="MetricsDumper")
+        self.thread.start()
+        logger.info("Dumping metrics to %s every %ss", path, interval)
+
+    def dump(self) -> None:
+        """Write one snapshot now."""
+        with open(self.path, "w") as f:
+            json.dump(self.registry.snapshot(), f, indent=4)
+
+    def stop(self) -> None:
+        """Stop dumping after writing a final snapshot."""
+        self.stop_event.set()
+        self.thread.join()
+        self.dump()
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.dump()
+            except Exception as e:
+                logger.error("Failed to dump metrics: %s", e)
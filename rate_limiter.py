@@ -0,0 +1,106 @@
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows roughly 20 messages per minute into a single group or channel
+# and about 30 messages per second across all chats for one bot.
+CHANNEL_MESSAGES_PER_MINUTE = 20
+GLOBAL_MESSAGES_PER_SECOND = 30
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a token bucket.
+
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum number of tokens the bucket can hold.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Reserve tokens from the bucket.
+
+        The bucket is allowed to go negative, so concurrent callers are served
+        in the order they reserved instead of racing each other on refill.
+
+        Args:
+            tokens: Number of tokens to take.
+
+        Returns:
+            float: Seconds the caller must wait before using the reservation.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def block_for(self, seconds: float) -> None:
+        """
+        Refuse to hand out tokens for the given number of seconds.
+
+        Args:
+            seconds: Duration of the block, e.g. a 429 retry_after value.
+        """
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class ChannelRateLimiter:
+    def __init__(self, per_minute: float = CHANNEL_MESSAGES_PER_MINUTE,
+                 global_per_second: float = GLOBAL_MESSAGES_PER_SECOND):
+        """
+        Initialize a rate limiter with one token bucket per channel plus a global bucket.
+
+        Args:
+            per_minute: Messages allowed per minute for each channel.
+            global_per_second: Messages allowed per second across all channels.
+        """
+        self.per_minute = per_minute
+        self.global_bucket = TokenBucket(global_per_second, global_per_second)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, channel_id: str) -> TokenBucket:
+        with self.lock:
+            bucket = self.buckets.get(channel_id)
+            if bucket is None:
+                bucket = TokenBucket(self.per_minute / 60.0, self.per_minute)
+                self.buckets[channel_id] = bucket
+            return bucket
+
+    def acquire(self, channel_id: str, tokens: float = 1) -> None:
+        """
+        Block until sending the given number of messages to a channel is allowed.
+
+        Args:
+            channel_id: Target Telegram channel ID.
+            tokens: Number of messages about to be sent.
+        """
+        wait = max(self._bucket(channel_id).reserve(tokens), self.global_bucket.reserve(tokens))
+        if wait > 0:
+            logger.debug("Rate limit reached for %s, waiting %.2fs", channel_id, wait)
+            time.sleep(wait)
+
+    def penalize(self, channel_id: str, retry_after: float) -> None:
+        """
+        Pause a channel after Telegram answered with 429 Too Many Requests.
+
+        Args:
+            channel_id: Channel that was flood limited.
+            retry_after: Seconds Telegram asked us to wait.
+        """
+        self._bucket(channel_id).block_for(retry_after)
+        logger.warning("Flood limit hit for %s, pausing for %ss", channel_id, retry_after)
@@ -0,0 +1,252 @@
+import io
+import math
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, Future
+from PIL import Image
+from metrics import REGISTRY as metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPLAY_FORMATS = ("gif", "webp")
+PALETTE_BYTES = 768
+# GIF frame delays are in hundredths of a second, and browsers clamp anything shorter
+MIN_FRAME_MS = 20
+
+
+class ReplayBuffer:
+    def __init__(self, capacity: int, max_bytes: int):
+        """
+        Fixed-size ring of paletted frames.
+
+        Every slot is a preallocated bytearray of 8-bit palette indices plus its
+        own 256-colour palette, so memory stays flat however long it records.
+        Slots are allocated on the first frame and again only if the frame size
+        changes, e.g. after switching the capture mode.
+
+        Args:
+            capacity: Number of frames kept.
+            max_bytes: Memory cap for all slots; frames are scaled down to fit.
+        """
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.size = None
+        self.slots = []
+        self.palettes = []
+        self.timestamps = [0.0] * capacity
+        self.next = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def frame_size(self, width: int, height: int) -> tuple:
+        """
+        Fit a frame size into the memory cap.
+
+        Args:
+            width: Frame width in pixels.
+            height: Frame height in pixels.
+
+        Returns:
+            tuple: The largest (width, height) with the same aspect ratio that fits.
+        """
+        per_frame = self.max_bytes // self.capacity - PALETTE_BYTES
+        if width * height <= per_frame:
+            return width, height
+        scale = math.sqrt(max(per_frame, 1) / (width * height))
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def add(self, frame: Image.Image, timestamp: float) -> None:
+        """
+        Store a frame, overwriting the oldest one once the ring is full.
+
+        Args:
+            frame: Paletted ("P" mode) image no larger than frame_size() allows.
+            timestamp: time.monotonic() of the grab.
+        """
+        palette = bytes(frame.getpalette()[:PALETTE_BYTES])
+        with self.lock:
+            if frame.size != self.size:
+                self._allocate(frame.size)
+            self.slots[self.next][:] = frame.tobytes()
+            self.palettes[self.next][:len(palette)] = palette
+            self.timestamps[self.next] = timestamp
+            self.next = (self.next + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def snapshot(self):
+        """
+        Copy out the buffered frames.
+
+        Returns:
+            tuple: (frame size, list of (indices, palette, timestamp) from oldest to newest).
+        """
+        with self.lock:
+            start = (self.next - self.count) % self.capacity
+            order = [(start + offset) % self.capacity for offset in range(self.count)]
+            return self.size, [(bytes(self.slots[i]), bytes(self.palettes[i]), self.timestamps[i]) for i in order]
+
+    def memory_bytes(self) -> int:
+        with self.lock:
+            return sum(len(slot) for slot in self.slots) + PALETTE_BYTES * len(self.palettes)
+
+    def _allocate(self, size: tuple) -> None:
+        width, height = size
+        self.size = size
+        self.slots = [bytearray(width * height) for _ in range(self.capacity)]
+        self.palettes = [bytearray(PALETTE_BYTES) for _ in range(self.capacity)]
+        self.next = 0
+        self.count = 0
+        logger.info("Replay buffer allocated: %s frames of %sx%s, %s bytes",
+                    self.capacity, width, height, self.capacity * (width * height + PALETTE_BYTES))
+
+
+class ReplayRecorder:
+    def __init__(self, grab, submit, seconds: float = 10.0, fps: float = 2.0, max_edge: int = 640,
+                 max_memory_mb: float = 32, max_cpu_percent: float = 10):
+        """
+        Continuously record low-resolution frames so the last seconds can be posted on demand.
+
+        Args:
+            grab: Callable returning a full-resolution screenshot.
+            submit: Callable like Executor.submit running a function on the thread
+                allowed to call grab, returning a Future.
+            seconds: Length of the replay window.
+            fps: Frames recorded per second.
+            max_edge: Downscale frames so their longest edge fits this many pixels.
+            max_memory_mb: Memory cap for the frame buffer.
+            max_cpu_percent: Share of one core recording may use. When grabbing and
+                quantizing a frame costs more, the recording rate is lowered. 0 disables the cap.
+        """
+        self.grab = grab
+        self.submit = submit
+        self.period = 1.0 / fps
+        self.max_edge = max_edge
+        self.max_cpu = max_cpu_percent / 100
+        self.buffer = ReplayBuffer(max(2, int(round(seconds * fps))), int(max_memory_mb * 1024 * 1024))
+        self.effective_period = self.period
+        self.encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ReplayEncoder")
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="ReplayRecorder")
+        self.thread.start()
+        metrics.register_gauge("replay_buffer_bytes", self.buffer.memory_bytes)
+        logger.info("Replay recording started: %ss at %s fps.", seconds, fps)
+
+    def save(self, image_format: str, callback) -> Future:
+        """
+        Encode the buffered window as an animation on the replay encoder thread.
+
+        Args:
+            image_format: One of REPLAY_FORMATS.
+            callback: Called with the encoded BytesIO, named after the replay, unless
+                the buffer is empty.
+
+        Returns:
+            Future: Resolves to the replay's file name, or None if nothing was recorded yet.
+
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        if image_format not in REPLAY_FORMATS:
+            raise ValueError(f"Unsupported replay format: {image_format}")
+
+        def run():
+            buffer = self.encode(image_format)
+            if buffer is not None:
+                callback(buffer)
+                return buffer.name
+            return None
+
+        return self.encoder.submit(run)
+
+    def encode(self, image_format: str = "gif"):
+        """
+        Encode the buffered window on the calling thread.
+
+        Args:
+            image_format: One of REPLAY_FORMATS.
+
+        Returns:
+            io.BytesIO: The animation, or None if nothing was recorded yet.
+        """
+        start = time.perf_counter()
+        size, frames = self.buffer.snapshot()
+        if not frames:
+            return None
+        images = []
+        for indices, palette, _ in frames:
+            image = Image.frombytes("P", size, indices)
+            image.putpalette(palette)
+            images.append(image if image_format == "gif" else image.convert("RGB"))
+        timestamps = [timestamp for _, _, timestamp in frames]
+        durations = [max(MIN_FRAME_MS, int((later - earlier) * 1000))
+                     for earlier, later in zip(timestamps, timestamps[1:])]
+        durations.append(max(MIN_FRAME_MS, int(self.effective_period * 1000)))
+
+        buffer = io.BytesIO()
+        buffer.name = f"replay_{datetime.now().strftime('%Y%m%d%H%M%S%f')[:-3]}.{image_format}"
+        options = {"quality": 80, "method": 0} if image_format == "webp" else {}
+        images[0].save(buffer, format=image_format.upper(), save_all=True, append_images=images[1:],
+                       duration=durations, loop=0, **options)
+        encode_time = time.perf_counter() - start
+        metrics.observe("replay_encode_seconds", encode_time)
+        logger.info("Encoded %s: %s frames in %.1f ms, %s bytes",
+                    buffer.name, len(images), encode_time * 1000, buffer.tell())
+        return buffer
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Buffered frames and seconds, frame size, memory use and the current recording rate.
+        """
+        size, count = self.buffer.size, self.buffer.count
+        return {
+            "frames": count,
+            "capacity": self.buffer.capacity,
+            "frame_size": list(size) if size else None,
+            "memory_bytes": self.buffer.memory_bytes(),
+            "fps": round(1.0 / self.effective_period, 2),
+        }
+
+    def stop(self) -> None:
+        """Stop recording and wait for pending replay encodes."""
+        self.stop_event.set()
+        self.thread.join()
+        self.encoder.shutdown(wait=True)
+
+    def _run(self) -> None:
+        deadline = time.monotonic()
+        while not self.stop_event.wait(max(0.0, deadline - time.monotonic())):
+            try:
+                cost = self.submit(self._record_frame).result()
+            except Exception as e:
+                logger.warning("Replay frame capture failed: %s", e)
+                cost = 0.0
+            # Stretch the period rather than exceed the CPU cap
+            self.effective_period = max(self.period, cost / self.max_cpu) if self.max_cpu > 0 else self.period
+            # Skip missed ticks instead of recording a burst to catch up
+            deadline = max(deadline + self.effective_period, time.monotonic())
+
+    def _record_frame(self) -> float:
+        """
+        Grab, shrink and quantize one frame into the ring.
+
+        Returns:
+            float: CPU seconds the frame cost on this thread.
+        """
+        start = time.thread_time()
+        image = self.grab()
+        timestamp = time.monotonic()
+        if self.max_edge and max(image.size) > self.max_edge:
+            # Integer box reduction is much cheaper than a filtered resize at full resolution
+            image = image.reduce(math.ceil(max(image.size) / self.max_edge))
+        size = self.buffer.frame_size(*image.size)
+        if size != image.size:
+            image = image.resize(size)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        self.buffer.add(image.quantize(256, method=Image.Quantize.FASTOCTREE), timestamp)
+        cost = time.thread_time() - start
+        metrics.observe("replay_frame_cpu_seconds", cost)
+        return cost
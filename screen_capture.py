@@ -0,0 +1,264 @@
+import sys
+import ctypes
+from PIL import ImageGrab, Image
+import logging
+
+logger = logging.getLogger(__name__)
+
+# "full" keeps the original ImageGrab.grab() behaviour
+CAPTURE_MODES = ("full", "monitor", "region", "window")
+GRAB_BACKENDS = ("auto", "mss", "imagegrab")
+# Finding the foreground window is only implemented with the Win32 API
+WINDOW_CAPTURE_SUPPORTED = sys.platform == "win32"
+
+
+def list_monitors() -> list:
+    """
+    List the bounding boxes of all attached monitors in virtual-desktop coordinates.
+
+    Returns:
+        list: (left, top, right, bottom) tuples, or an empty list if the platform
+            does not support monitor enumeration.
+    """
+    if sys.platform != "win32":
+        return []
+    from ctypes import wintypes
+
+    monitors = []
+    monitor_enum_proc = ctypes.WINFUNCTYPE(
+        ctypes.c_int, wintypes.HMONITOR, wintypes.HDC, ctypes.POINTER(wintypes.RECT), wintypes.LPARAM
+    )
+
+    def callback(hmonitor, hdc, rect, data):
+        r = rect.contents
+        monitors.append((r.left, r.top, r.right, r.bottom))
+        return 1
+
+    ctypes.windll.user32.EnumDisplayMonitors(None, None, monitor_enum_proc(callback), 0)
+    return monitors
+
+
+def active_window_bbox():
+    """
+    Get the bounding box of the foreground window.
+
+    Returns:
+        (left, top, right, bottom) tuple, or None if unavailable on this platform.
+    """
+    if sys.platform != "win32":
+        return None
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    hwnd = user32.GetForegroundWindow()
+    if not hwnd:
+        return None
+    rect = wintypes.RECT()
+    if not user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+        return None
+    return rect.left, rect.top, rect.right, rect.bottom
+
+
+def parse_region(value):
+    """
+    Validate a capture region.
+
+    Args:
+        value: (left, top, right, bottom) sequence, a "left,top,right,bottom" string,
+            or None or an empty string for no region.
+
+    Returns:
+        tuple: The region as four ints, or None.
+
+    Raises:
+        ValueError: If the value is not four integers spanning a non-empty box.
+    """
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    try:
+        left, top, right, bottom = (int(coordinate) for coordinate in
+                                    (value.split(",") if isinstance(value, str) else value))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid capture region: {value}. Expected left,top,right,bottom") from None
+    if right <= left or bottom <= top:
+        raise ValueError(f"Invalid capture region: right and bottom must exceed left and top: {value}")
+    return left, top, right, bottom
+
+
+def capture_bbox(mode: str, monitor: int = 0, region=None, backend=None):
+    """
+    Resolve a capture mode to the screen area to grab.
+
+    Args:
+        mode: One of CAPTURE_MODES.
+        monitor: Monitor index for the "monitor" mode.
+        region: Saved (left, top, right, bottom) box for the "region" mode.
+        backend: Grab backend whose monitor list is used; list_monitors() if omitted.
+
+    Returns:
+        (left, top, right, bottom) tuple, or None to grab the full screen.
+    """
+    if mode == "monitor":
+        monitors = backend.monitors() if backend else list_monitors()
+        if monitor < len(monitors):
+            return monitors[monitor]
+        logger.warning("Monitor %s not available, capturing full screen.", monitor)
+    elif mode == "region":
+        if region:
+            return tuple(region)
+        logger.warning("No capture region saved, capturing full screen.")
+    elif mode == "window":
+        bbox = active_window_bbox()
+        if bbox:
+            return bbox
+        logger.warning("Active window not available, capturing full screen.")
+    return None
+
+
+class ImageGrabBackend:
+    name = "imagegrab"
+
+    def grab(self, bbox=None) -> Image.Image:
+        """
+        Grab the screen with PIL, which sets up a new device context on every call.
+
+        Args:
+            bbox: (left, top, right, bottom) box in virtual-desktop coordinates, or None
+                for the primary screen.
+
+        Returns:
+            Image.Image: The captured image.
+        """
+        if bbox is None:
+            return ImageGrab.grab()
+        # all_screens makes boxes on secondary monitors reachable on Windows
+        return ImageGrab.grab(bbox=bbox, all_screens=True)
+
+    def monitors(self) -> list:
+        return list_monitors()
+
+    def close(self) -> None:
+        pass
+
+
+class MssBackend:
+    name = "mss"
+
+    def __init__(self):
+        """
+        Grab the screen through one persistent mss handle.
+
+        The handle keeps its device contexts and buffers between grabs, so only
+        the first grab pays the setup cost. mss handles are not thread-safe: the
+        backend must be created, used and closed on a single thread.
+
+        Raises:
+            ImportError: If mss is not installed.
+        """
+        import mss
+
+        self.sct = mss.mss()
+
+    def grab(self, bbox=None) -> Image.Image:
+        """
+        Args:
+            bbox: (left, top, right, bottom) box in virtual-desktop coordinates, or None
+                for the primary screen.
+
+        Returns:
+            Image.Image: The captured image.
+        """
+        if bbox is None:
+            monitors = self.sct.monitors
+            # Index 0 spans all monitors; 1 is the primary one, as grabbed by ImageGrab.grab()
+            area = monitors[1] if len(monitors) > 1 else monitors[0]
+        else:
+            left, top, right, bottom = bbox
+            area = {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        shot = self.sct.grab(area)
+        return Image.frombuffer("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+    def monitors(self) -> list:
+        """
+        List monitors as mss sees them, which works on every platform mss supports.
+
+        Returns:
+            list: (left, top, right, bottom) tuples in virtual-desktop coordinates.
+        """
+        return [
+            (area["left"], area["top"], area["left"] + area["width"], area["top"] + area["height"])
+            for area in self.sct.monitors[1:]
+        ]
+
+    def close(self) -> None:
+        self.sct.close()
+
+
+def create_grab_backend(name: str = "auto"):
+    """
+    Create a screen grab backend.
+
+    Args:
+        name: One of GRAB_BACKENDS. "auto" prefers mss and falls back to ImageGrab
+            if mss is missing or cannot open the display.
+
+    Returns:
+        The backend, with grab(bbox), monitors() and close() methods.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    if name not in GRAB_BACKENDS:
+        raise ValueError(f"Unsupported grab backend: {name}")
+    if name in ("auto", "mss"):
+        try:
+            return MssBackend()
+        except Exception as e:
+            if name == "mss":
+                raise
+            logger.info("mss unavailable, grabbing with ImageGrab: %s", e)
+    return ImageGrabBackend()
+
+
+def grab_screen(mode: str = "full", monitor: int = 0, region=None, backend=None) -> Image.Image:
+    """
+    Grab the screen area selected by a capture mode.
+
+    Args:
+        mode: One of CAPTURE_MODES.
+        monitor: Monitor index for the "monitor" mode.
+        region: Saved (left, top, right, bottom) box for the "region" mode.
+        backend: Grab backend to use; a one-off ImageGrab grab if omitted.
+
+    Returns:
+        Image.Image: The captured image.
+    """
+    backend = backend or ImageGrabBackend()
+    return backend.grab(capture_bbox(mode, monitor, region, backend))
+
+
+def next_capture_mode(mode: str, monitor: int, has_region: bool, monitors: list = None):
+    """
+    Step to the next capture mode for the mode-cycling hotkey.
+
+    Every monitor is its own step, so the cycle is full screen, each monitor,
+    the saved region (if any) and finally the active window where supported.
+
+    Args:
+        mode: Current capture mode.
+        monitor: Current monitor index.
+        has_region: Whether a capture region is saved.
+        monitors: Monitor boxes from the active grab backend; list_monitors() if omitted.
+
+    Returns:
+        tuple: The next (mode, monitor).
+    """
+    steps = [("full", 0)]
+    steps += [("monitor", index) for index in range(len(list_monitors() if monitors is None else monitors))]
+    if has_region:
+        steps.append(("region", 0))
+    if WINDOW_CAPTURE_SUPPORTED:
+        steps.append(("window", 0))
+    current = (mode, monitor if mode == "monitor" else 0)
+    position = steps.index(current) if current in steps else -1
+    return steps[(position + 1) % len(steps)]
@@ -0,0 +1,78 @@
+import threading
+import requests
+import telebot
+from requests.adapters import HTTPAdapter
+from telebot import apihelper
+import logging
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_bots = {}
+_bot_info = {}
+
+
+def configure_session(pool_size: int) -> requests.Session:
+    """
+    Install one keep-alive HTTP session shared by every TeleBot in the process.
+
+    telebot normally creates a session per thread; setting apihelper.session makes
+    all threads (upload workers, text messages, polling) reuse one connection pool,
+    so requests after the first skip the TCP and TLS handshake.
+
+    Args:
+        pool_size: Maximum number of pooled connections to the Bot API host. Should
+            cover the upload workers plus the polling and text message threads.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    with _lock:
+        apihelper.session = session
+    logger.info("Shared Telegram HTTP session configured with a pool of %s connection(s).", pool_size)
+    return session
+
+
+def get_bot(api_token: str) -> telebot.TeleBot:
+    """
+    Get the shared TeleBot instance for a token, creating it on first use.
+
+    Args:
+        api_token: Telegram API token.
+
+    Returns:
+        telebot.TeleBot: The shared bot instance.
+    """
+    with _lock:
+        bot = _bots.get(api_token)
+        if bot is None:
+            bot = telebot.TeleBot(api_token)
+            _bots[api_token] = bot
+        return bot
+
+
+def validate_token(api_token: str):
+    """
+    Validate a token with get_me, calling the API at most once per token per session.
+
+    Args:
+        api_token: Telegram API token.
+
+    Returns:
+        telebot.types.User: The bot's user info.
+
+    Raises:
+        telebot.apihelper.ApiException: If the token is rejected.
+    """
+    with _lock:
+        info = _bot_info.get(api_token)
+    if info is None:
+        info = get_bot(api_token).get_me()
+        with _lock:
+            _bot_info[api_token] = info
+        logger.info("Telegram token validated for bot: %s", info.username)
+    return info
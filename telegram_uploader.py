@@ -1,33 +1,436 @@
 import os
+import json
 import time
+import heapq
+import hashlib
 import queue
+import random
+import itertools
 import threading
+import contextlib
+from collections import OrderedDict
+import requests
 import telebot
-from utils import safe_delete, move_to_unsent
+from utils import delete_later, move_to_unsent, copy_to_unsent, write_to_unsent, RetryScheduler
+from rate_limiter import ChannelRateLimiter
+from upload_journal import UploadJournal
+from config_manager import parse_channel_ids
+from metrics import REGISTRY as metrics
+from adaptive_quality import BandwidthEstimator, PHOTO_MAX_BYTES
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Telegram accepts between 2 and 10 items in a single media group
+MAX_ALBUM_SIZE = 10
+
+# Queue priorities, lower values are sent first
+PRIORITY_TEXT = 0
+PRIORITY_LIVE = 1
+PRIORITY_BACKLOG = 2
+
+UNSENT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.txt')
+# Subdirectory of the unsent directory for items that failed permanently; it is never re-drained
+QUARANTINE_DIRECTORY = 'failed'
+# Sidecar next to an unsent file with what a re-drain needs: channels already reached, caption and media kind
+METADATA_SUFFIX = '.unsent.json'
+
+# Bytes read at a time when hashing file-backed images
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_retry_after(error: Exception):
+    """
+    Extract the retry_after value from a Telegram 429 error.
+
+    Args:
+        error: Exception raised by the Telegram API call.
+
+    Returns:
+        Seconds to wait as requested by Telegram, or None if not a flood error.
+    """
+    if getattr(error, 'error_code', None) != 429:
+        return None
+    parameters = (getattr(error, 'result_json', None) or {}).get('parameters') or {}
+    return parameters.get('retry_after')
+
+
+def is_network_error(error: Exception) -> bool:
+    """
+    Check whether a send failed on the way to Telegram rather than locally or in Telegram itself.
+
+    Args:
+        error: Exception raised by the Telegram API call.
+
+    Returns:
+        bool: True for connection errors, timeouts and non-JSON HTTP errors, e.g. from a proxy.
+    """
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              telebot.apihelper.ApiHTTPException))
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Classify a failed send.
+
+    Rate limits (429), server errors (5xx) and network errors are transient.
+    Other Telegram errors, such as 400 Bad Request or 403 Forbidden, will fail
+    the same way again, as will local errors such as a missing file.
+
+    Args:
+        error: Exception raised by the Telegram API call.
+
+    Returns:
+        bool: True if the send should be retried.
+    """
+    if isinstance(error, telebot.apihelper.ApiTelegramException):
+        return error.error_code == 429 or error.error_code >= 500
+    return is_network_error(error)
+
+
+def is_photo_rejected(error: Exception) -> bool:
+    """
+    Check whether Telegram refused an image as a photo, e.g. for its dimensions.
+
+    Args:
+        error: Exception raised by the Telegram API call.
+
+    Returns:
+        bool: True if the image should be sent as a document instead.
+    """
+    if getattr(error, 'error_code', None) != 400:
+        return False
+    description = getattr(error, 'description', None) or str(error)
+    return 'PHOTO_INVALID_DIMENSIONS' in description or 'too big' in description
+
+
+def read_unsent_metadata(path: str) -> dict:
+    """
+    Read the sidecar of an unsent file.
+
+    Args:
+        path: Path of the unsent file.
+
+    Returns:
+        dict: Optional "delivered" channel IDs, "caption" and "media_kind"; empty
+            if there is no readable sidecar.
+    """
+    try:
+        with open(path + METADATA_SUFFIX, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if not isinstance(metadata, dict):
+            raise ValueError("not a JSON object")
+        return metadata
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable unsent metadata for %s: %s", path, e)
+        return {}
+
+
+def get_file_id(message, kind: str):
+    """
+    Extract the file_id Telegram assigned to an uploaded photo, document or animation.
+
+    Args:
+        message: Message returned by send_photo, send_document, send_animation or send_media_group.
+        kind: "photo", "document" or "animation".
+
+    Returns:
+        The file_id, or None if the message carries no such file.
+    """
+    if kind == "photo":
+        # Telegram returns every generated size, the largest last
+        photo = getattr(message, 'photo', None)
+        return photo[-1].file_id if photo else None
+    media = getattr(message, kind, None)
+    return media.file_id if media else None
+
+
+class FileIdCache:
+    def __init__(self, max_entries: int = 256):
+        """
+        Remember the file_id of recently uploaded content, keyed by content hash.
+
+        Sending a file_id makes Telegram reuse the stored file instead of
+        receiving the bytes again.
+
+        Args:
+            max_entries: Number of entries kept, least recently used first out.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns:
+            The cached file_id for a (content hash, kind) key, or None.
+        """
+        with self.lock:
+            file_id = self.entries.get(key)
+            if file_id is not None:
+                self.entries.move_to_end(key)
+            return file_id
+
+    def put(self, key, file_id: str) -> None:
+        with self.lock:
+            self.entries[key] = file_id
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class UploadItem:
+    def __init__(self, caption: str = None, image_path: str = None, buffer=None, filename: str = None,
+                 journal_id: int = None, attempts: int = 0, priority: int = PRIORITY_LIVE,
+                 on_complete=None, text: str = None, captured_at: float = None, as_document: bool = False,
+                 keep_file: bool = False, as_animation: bool = False, on_unsent=None,
+                 droppable: bool = False):
+        """
+        A queued screenshot, backed either by a file on disk or an in-memory buffer,
+        or a text message if text is set.
+
+        Args:
+            caption: Optional caption for the screenshot.
+            image_path: Path to the screenshot file.
+            buffer: Binary file-like object holding the encoded image.
+            filename: File name used for uploads and when persisting a buffer.
+            journal_id: ID of the entry in the upload journal, if journaled.
+            attempts: Number of send attempts already made.
+            priority: Queue priority, one of the PRIORITY_* constants.
+            on_complete: Optional callback invoked with True or False once the item
+                was sent or gave up.
+            text: Text message to send instead of an image. image_path may then
+                point at the message's file in the unsent directory.
+            captured_at: time.monotonic() of the capture, for end-to-end latency.
+            as_document: Send the image as a file instead of a compressed photo.
+            keep_file: Leave image_path in place after sending, and copy rather than
+                move it to the unsent directory on failure.
+            as_animation: Send the image as an animation, e.g. an animated GIF.
+            on_unsent: Optional callback invoked with the path of the unsent copy,
+                before on_complete, once a failed item was kept in the unsent directory.
+            droppable: Backpressure may discard the item before its first attempt,
+                e.g. a timed capture that a newer frame supersedes.
+        """
+        self.caption = caption
+        self.image_path = image_path
+        self.buffer = buffer
+        self.filename = filename or (os.path.basename(image_path) if image_path else None)
+        self.journal_id = journal_id
+        self.attempts = attempts
+        self.priority = priority
+        self.on_complete = on_complete
+        self.text = text
+        self.captured_at = captured_at
+        self.as_document = as_document
+        self.keep_file = keep_file
+        self.as_animation = as_animation
+        self.on_unsent = on_unsent
+        self.droppable = droppable
+        self.enqueued_at = None
+        # Channels the item already reached, so retries only go to the rest
+        self.delivered = set()
+        # (kind, file_id) Telegram assigned to the first upload of this item
+        self.file_id = None
+        self.digest = None
+
+    @property
+    def is_text(self) -> bool:
+        return self.text is not None
+
+    @property
+    def name(self) -> str:
+        return self.image_path or f"<memory:{self.filename}>"
+
+    @property
+    def size(self) -> int:
+        if self.is_text:
+            return len(self.text.encode('utf-8'))
+        if self.buffer is not None:
+            return self.buffer.getbuffer().nbytes
+        return os.path.getsize(self.image_path)
+
+    @property
+    def media_kind(self) -> str:
+        """
+        How the image is sent: "animation", "document" if requested or over the
+        photo size limit, otherwise "photo".
+        """
+        if self.as_animation:
+            return "animation"
+        if self.as_document:
+            return "document"
+        try:
+            return "document" if self.size > PHOTO_MAX_BYTES else "photo"
+        except OSError:
+            return "photo"
+
+    def content_hash(self) -> bytes:
+        """
+        Hash the image content, computed once per item.
+
+        Returns:
+            bytes: BLAKE2b digest of the encoded image.
+        """
+        if self.digest is None:
+            digest = hashlib.blake2b(digest_size=16)
+            with self.open() as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            self.digest = digest.digest()
+        return self.digest
+
+    def open(self):
+        """
+        Open the image for reading.
+
+        Returns:
+            A context manager yielding a binary file-like object.
+        """
+        if self.buffer is None:
+            return open(self.image_path, 'rb')
+        self.buffer.seek(0)
+        return contextlib.nullcontext(self.buffer)
+
+    def discard(self) -> None:
+        """Release the image or message file after a successful upload. Files are deleted in the background."""
+        if self.buffer is not None:
+            self.buffer.close()
+        elif self.image_path and not self.keep_file:
+            delete_later(self.image_path)
+            if os.path.exists(self.image_path + METADATA_SUFFIX):
+                delete_later(self.image_path + METADATA_SUFFIX)
+
+    def persist_unsent(self, unsent_directory: str, permanent: bool = False):
+        """
+        Keep the image in the unsent directory after every attempt failed.
+
+        The channels it already reached, its caption and how it is sent are
+        recorded in a sidecar file, so a re-drain sends it the same way and only
+        to the channels still missing.
+
+        Args:
+            unsent_directory: Destination directory for unsent files.
+            permanent: The failure will not go away by retrying, e.g. 403 Forbidden.
+                The item is quarantined in the QUARANTINE_DIRECTORY subdirectory,
+                which is never re-drained.
+
+        Returns:
+            The path of the kept file, or None if it could not be kept.
+        """
+        if self.image_path and not os.path.exists(self.image_path):
+            logger.error("Unsent file no longer exists, nothing to keep: %s", self.image_path)
+            return None
+        metadata = self.unsent_metadata()  # Before moving, while the size is still readable
+        directory = os.path.join(unsent_directory, QUARANTINE_DIRECTORY) if permanent else unsent_directory
+        os.makedirs(directory, exist_ok=True)
+        destination = os.path.join(directory, self.filename)
+        moved_from = None
+        if self.image_path:
+            # A re-drained file may already be in place
+            if os.path.abspath(self.image_path) != os.path.abspath(destination):
+                if self.keep_file:
+                    destination = copy_to_unsent(self.image_path, directory)
+                else:
+                    destination = move_to_unsent(self.image_path, directory)
+                    moved_from = self.image_path
+        elif self.is_text:
+            destination = write_to_unsent(self.text.encode('utf-8'), self.filename, directory)
+        else:
+            destination = write_to_unsent(self.buffer.getvalue(), self.filename, directory)
+            self.buffer.close()
+        if destination is None:
+            return None
+        try:
+            if moved_from and os.path.exists(moved_from + METADATA_SUFFIX):
+                os.remove(moved_from + METADATA_SUFFIX)  # Stale record of a quarantined backlog file
+            if metadata:
+                with open(destination + METADATA_SUFFIX, 'w', encoding='utf-8') as f:
+                    json.dump(metadata, f)
+            elif os.path.exists(destination + METADATA_SUFFIX):
+                os.remove(destination + METADATA_SUFFIX)
+        except OSError as e:
+            logger.error("Failed to record unsent metadata for %s: %s", destination, e)
+        return destination
+
+    def unsent_metadata(self) -> dict:
+        """
+        Returns:
+            dict: What persist_unsent records beside the file; defaults are left out.
+        """
+        metadata = {}
+        if self.delivered:
+            metadata["delivered"] = sorted(self.delivered)
+        if self.caption:
+            metadata["caption"] = self.caption
+        if not self.is_text and self.media_kind != "photo":
+            metadata["media_kind"] = self.media_kind
+        return metadata
+
 
 class TelegramScreenshotUploader:
-    def __init__(self, bot: telebot.TeleBot, channel_id: str, max_retry_attempts: int = 3):
+    def __init__(self, bot: telebot.TeleBot, channel_id, max_retry_attempts: int = 3,
+                 num_workers: int = 1, rate_limiter: ChannelRateLimiter = None,
+                 sequence_captions: bool = False, album_window: float = 0.0,
+                 journal: UploadJournal = None, bandwidth: BandwidthEstimator = None,
+                 file_id_cache_size: int = 256):
         """
         Initialize the Telegram screenshot uploader.
 
         Args:
             bot: Telegram bot instance.
-            channel_id: Target Telegram channel ID.
+            channel_id: Target Telegram channel ID, or a list of IDs to deliver every
+                item to. Images are uploaded to the first channel only and forwarded
+                to the others by file_id.
             max_retry_attempts: Maximum retry attempts for sending screenshots.
+            num_workers: Number of upload worker threads sharing the queue.
+            rate_limiter: Per-channel rate limiter; a default one is created if omitted.
+            sequence_captions: Prefix captions with a per-channel sequence number so the
+                capture order stays visible when several workers upload in parallel.
+            album_window: Seconds a worker lingers for more queued screenshots to send
+                together as one album. 0 disables album coalescing.
+            journal: Optional on-disk journal that keeps file-backed uploads across
+                restarts. In-memory uploads are never journaled.
+            bandwidth: Estimator fed with the timing of every image upload; a new one
+                is created if omitted.
+            file_id_cache_size: Number of recent uploads whose file_id is reused when
+                the same image is sent again. 0 disables the cache.
         """
         self.bot = bot
-        self.channel_id = channel_id
-        self.screenshot_queue = queue.Queue()
+        self.channel_ids = parse_channel_ids(channel_id)
+        self.channel_id = self.channel_ids[0]
+        self.file_ids = FileIdCache(file_id_cache_size) if file_id_cache_size > 0 else None
+        self.screenshot_queue = queue.PriorityQueue()
+        self.queue_order = itertools.count()
         self.max_retry_attempts = max_retry_attempts
+        self.rate_limiter = rate_limiter or ChannelRateLimiter()
+        self.sequence_captions = sequence_captions
+        self.album_window = album_window
+        self.journal = journal
+        self.bandwidth = bandwidth or BandwidthEstimator()
+        self.sequence = itertools.count(1)
+        self.sequence_lock = threading.Lock()
         self.unsent_directory = None
+        self.redrainer = None
+        self.offline = False
+        self.on_connectivity_restored = None
         self.stop_event = threading.Event()
-        self.upload_thread = threading.Thread(target=self._upload_worker, daemon=True, name="UploadWorker")
-        self.upload_thread.start()
-        logger.info("TelegramScreenshotUploader initialized.")
+        # Failed sends wait here for their next attempt instead of blocking a worker
+        self.retry_scheduler = RetryScheduler(name="UploadRetryScheduler")
+        self.upload_threads = []
+        for index in range(max(1, num_workers)):
+            thread = threading.Thread(target=self._upload_worker, daemon=True, name=f"UploadWorker-{index}")
+            thread.start()
+            self.upload_threads.append(thread)
+        metrics.register_gauge("upload_queue_depth", self.screenshot_queue.qsize)
+        metrics.register_gauge("upload_retry_pending", self.retry_scheduler.pending)
+        metrics.register_gauge("upload_bandwidth_bytes_per_second", lambda: self.bandwidth.estimate() or 0)
+        logger.info("TelegramScreenshotUploader initialized with %s worker(s).", len(self.upload_threads))
 
     def set_unsent_directory(self, path: str) -> None:
         """
@@ -38,63 +441,644 @@ class TelegramScreenshotUploader:
         """
         self.unsent_directory = path
         os.makedirs(path, exist_ok=True)
-        logger.info(f"Unsent directory set to: {path}")
+        logger.info("Unsent directory set to: %s", path)
 
-    def enqueue_screenshot(self, image_path: str, caption: str = None) -> None:
+    def enqueue_screenshot(self, image_path: str, caption: str = None, captured_at: float = None,
+                           on_complete=None, as_document: bool = False, keep_file: bool = False,
+                           on_unsent=None, droppable: bool = False) -> None:
         """
         Enqueue a screenshot for upload.
 
         Args:
             image_path: Path to the screenshot file.
             caption: Optional caption for the screenshot.
+            captured_at: time.monotonic() of the capture, for end-to-end latency.
+            on_complete: Optional callback invoked with True or False from an upload
+                worker thread once the screenshot was sent or gave up.
+            as_document: Send the full-fidelity file instead of a compressed photo.
+            keep_file: Never delete or move the file, e.g. for files owned by another
+                tool. Such uploads are not journaled; their owner tracks them instead.
+            on_unsent: Optional callback invoked with the path of the copy in the
+                unsent directory if the screenshot was kept there after failing.
+            droppable: Let drop_oldest() discard the screenshot while it waits.
+        """
+        caption = self._number_caption(caption)
+        journal_id = self.journal.add(image_path, caption) if self.journal and not keep_file else None
+        self._put(UploadItem(caption, image_path=image_path, journal_id=journal_id, captured_at=captured_at,
+                             on_complete=on_complete, as_document=as_document, keep_file=keep_file,
+                             on_unsent=on_unsent, droppable=droppable))
+        logger.info("Screenshot queued: %s (Caption: %s)", image_path, caption)
+
+    def enqueue_image_buffer(self, buffer, filename: str, caption: str = None, captured_at: float = None,
+                             on_complete=None, as_document: bool = False, as_animation: bool = False,
+                             droppable: bool = False) -> None:
+        """
+        Enqueue an encoded screenshot held in memory, skipping the disk round trip.
+
+        The image is only written to disk, in the unsent directory, if every
+        upload attempt fails.
+
+        Args:
+            buffer: Binary file-like object holding the encoded image.
+            filename: File name for the upload and for the unsent fallback.
+            caption: Optional caption for the screenshot.
+            captured_at: time.monotonic() of the capture, for end-to-end latency.
+            on_complete: Optional callback invoked with True or False from an upload
+                worker thread once the screenshot was sent or gave up.
+            as_document: Send the full-fidelity file instead of a compressed photo.
+            as_animation: Send an animated GIF as an animation that plays inline.
+            droppable: Let drop_oldest() discard the screenshot while it waits.
         """
-        self.screenshot_queue.put((image_path, caption))
-        logger.info(f"Screenshot queued: {image_path} (Caption: {caption})")
+        caption = self._number_caption(caption)
+        self._put(UploadItem(caption, buffer=buffer, filename=filename, captured_at=captured_at,
+                             on_complete=on_complete, as_document=as_document, as_animation=as_animation,
+                             droppable=droppable))
+        logger.info("Screenshot queued in memory: %s (Caption: %s)", filename, caption)
+
+    def enqueue_message(self, text: str, on_complete=None) -> None:
+        """
+        Enqueue a text message ahead of any queued screenshots.
+
+        Messages get the same retries as screenshots and are written to the
+        unsent directory as .txt files if every attempt fails.
+
+        Args:
+            text: Message text.
+            on_complete: Optional callback invoked with True or False from an upload
+                worker thread once the message was sent or gave up.
+        """
+        filename = f"message_{time.strftime('%Y%m%d%H%M%S')}_{next(self.queue_order)}.txt"
+        self._put(UploadItem(filename=filename, priority=PRIORITY_TEXT, on_complete=on_complete, text=text))
+        logger.info("Message queued: %s", filename)
+
+    def resume_journal(self) -> None:
+        """Re-enqueue uploads left pending in the journal by a previous run."""
+        if not self.journal:
+            return
+        resumed = 0
+        for journal_id, image_path, caption, attempts, next_attempt, delivered in self.journal.pending():
+            if not os.path.exists(image_path):
+                logger.warning("Dropping journaled upload with missing file: %s", image_path)
+                self.journal.complete(journal_id)
+                continue
+            item = UploadItem(caption, image_path=image_path, journal_id=journal_id,
+                              attempts=min(attempts, self.max_retry_attempts - 1))
+            # Channels dropped from the configuration since do not count as reached
+            item.delivered = set(delivered) & set(self.channel_ids)
+            self.retry_scheduler.schedule(next_attempt - time.time(), self._put, item)
+            resumed += 1
+        logger.info("Resumed %s pending upload(s) from the journal.", resumed)
+
+    def start_redrain(self, interval: float = 2.0, base_backoff: float = 30.0, max_backoff: float = 1800.0) -> None:
+        """
+        Start re-sending files from the unsent directory in the background.
+
+        Args:
+            interval: Seconds between two re-enqueued backlog files.
+            base_backoff: Seconds to wait before rescanning after a failed round.
+            max_backoff: Upper bound for the exponential backoff between rounds.
+        """
+        if not self.unsent_directory:
+            logger.warning("Cannot re-drain unsent screenshots without an unsent directory.")
+            return
+        self.redrainer = UnsentRedrainer(self, interval, base_backoff, max_backoff)
+        self.on_connectivity_restored = self.redrainer.trigger
+
+    def pending_count(self, max_priority: int = PRIORITY_BACKLOG) -> int:
+        """
+        Count queued items at or above a priority.
+
+        Args:
+            max_priority: Largest priority value to include.
+
+        Returns:
+            int: Number of matching queued items.
+        """
+        with self.screenshot_queue.mutex:
+            return sum(1 for priority, _, _ in self.screenshot_queue.queue if priority <= max_priority)
+
+    def drop_oldest(self, priority: int = PRIORITY_LIVE) -> bool:
+        """
+        Drop the oldest queued item of a priority to relieve backpressure.
+
+        Only items enqueued as droppable that were not attempted yet are
+        dropped; hotkey captures, watched files and retries are always kept.
+        The dropped image is discarded without being sent.
+
+        Args:
+            priority: Priority lane to drop from.
+
+        Returns:
+            bool: True if an item was dropped, False if the lane held nothing droppable.
+        """
+        with self.screenshot_queue.mutex:
+            entries = [entry for entry in self.screenshot_queue.queue
+                       if entry[0] == priority and entry[2].droppable
+                       and entry[2].attempts == 0 and not entry[2].delivered]
+            if not entries:
+                return False
+            oldest = min(entries, key=lambda entry: entry[1])
+            self.screenshot_queue.queue.remove(oldest)
+            heapq.heapify(self.screenshot_queue.queue)
+        self.screenshot_queue.task_done()
+        item = oldest[2]
+        item.discard()
+        self._complete(item)
+        self._notify(item, False)
+        logger.warning("Dropped queued screenshot under backpressure: %s", item.name)
+        return True
+
+    def _put(self, item: UploadItem) -> None:
+        item.enqueued_at = time.monotonic()
+        self.screenshot_queue.put((item.priority, next(self.queue_order), item))
+
+    def _number_caption(self, caption: str = None) -> str:
+        if not self.sequence_captions:
+            return caption
+        with self.sequence_lock:
+            number = next(self.sequence)
+        return f"#{number} {caption}" if caption else f"#{number}"
 
     def stop(self) -> None:
-        """Stop the upload worker thread."""
-        self.stop_event.set()
+        """
+        Stop the upload worker threads and close the journal.
+
+        Each worker finishes the send it is in. Items still queued or waiting
+        for a retry stay in the journal and are resumed on the next start;
+        the rest are kept in the unsent directory.
+        """
         logger.info("Stopping TelegramScreenshotUploader.")
+        self.stop_event.set()
+        self.retry_scheduler.stop()
+        if self.redrainer:
+            self.redrainer.stop()
+        for thread in self.upload_threads:
+            thread.join()
+        unfinished = [args[0] for func, args in self.retry_scheduler.drain() if func == self._put]
+        while True:
+            try:
+                unfinished.append(self.screenshot_queue.get_nowait()[2])
+            except queue.Empty:
+                break
+            self.screenshot_queue.task_done()
+        for item in unfinished:
+            self._keep_unfinished(item)
+        if self.journal:
+            # Its writer is a daemon thread, so buffered adds and completes would be lost at exit
+            self.journal.close()
 
     def _upload_worker(self) -> None:
         """Worker thread to process the screenshot queue."""
         while not self.stop_event.is_set():
             try:
-                image_path, caption = self.screenshot_queue.get(timeout=1)
-                success = self._send_screenshot(image_path, caption)
-                self.screenshot_queue.task_done()
-                if not success and self.unsent_directory:
-                    move_to_unsent(image_path, self.unsent_directory)
+                batch = [self.screenshot_queue.get(timeout=1)[2]]
             except queue.Empty:
                 continue
+            try:
+                if self.album_window > 0 and self._album_eligible(batch[0]):
+                    batch.extend(self._drain_batch())
+                now = time.monotonic()
+                for item in batch:
+                    metrics.observe("queue_wait_seconds", now - item.enqueued_at)
+                if len(batch) > 1:
+                    self._send_album(batch)
+                else:
+                    self._process_screenshot(batch[0])
             except Exception as e:
-                logger.error(f"Unexpected error in upload worker: {e}")
+                logger.error("Unexpected error in upload worker: %s", e)
+            finally:
+                for _ in batch:
+                    self.screenshot_queue.task_done()
+
+    def _drain_batch(self) -> list:
+        """
+        Collect further queued screenshots that arrive within the album window.
+
+        Returns:
+            list: Up to MAX_ALBUM_SIZE - 1 additional upload items.
+        """
+        batch = []
+        deadline = time.monotonic() + self.album_window
+        while len(batch) < MAX_ALBUM_SIZE - 1:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self.screenshot_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if not self._album_eligible(entry[2]):
+                # Hand it back for the next worker, keeping its place and queue age
+                self.screenshot_queue.put(entry)
+                self.screenshot_queue.task_done()
+                break
+            batch.append(entry[2])
+        return batch
+
+    @staticmethod
+    def _album_eligible(item: UploadItem) -> bool:
+        """
+        Albums only hold photos that reached no channel yet; an album always
+        goes to the first channel, so a partly delivered item would be posted twice.
+        """
+        return not item.is_text and not item.delivered and item.media_kind == "photo"
 
-    def _send_screenshot(self, image_path: str, caption: str = None) -> bool:
+    def _process_screenshot(self, item: UploadItem) -> None:
         """
-        Send a screenshot to Telegram with retries.
+        Make one send attempt for an item.
+
+        A transient failure schedules the next attempt on the retry heap and
+        returns at once, so the worker moves on to the next queued item. Once
+        attempts run out, or on a permanent error, the item is kept in the
+        unsent directory.
 
         Args:
-            image_path: Path to the screenshot file.
-            caption: Optional caption for the screenshot.
+            item: Screenshot or message to send.
+        """
+        delay = self._send_screenshot(item)
+        if delay is None:
+            self._record_delivery(item)
+            self._notify(item, True)
+            return
+        if delay >= 0 and item.attempts < self.max_retry_attempts:
+            if self.journal and item.journal_id is not None:
+                self.journal.record_attempt(item.journal_id, item.attempts, time.time() + delay, item.delivered)
+            metrics.inc("upload_retries_scheduled_total")
+            self.retry_scheduler.schedule(delay, self._put, item)
+            return
+        kind = "message" if item.is_text else "screenshot"
+        logger.error("Failed to send %s after %s attempt(s): %s", kind, item.attempts, item.name)
+        metrics.inc("upload_failures_total")
+        if self.unsent_directory:
+            permanent = delay < 0
+            if permanent:
+                logger.warning("Quarantining %s after a permanent error; it will not be re-drained.", item.name)
+                metrics.inc("upload_quarantined_total")
+            self._keep_unsent(item, permanent)
+        self._notify(item, False)
+
+    def _keep_unfinished(self, item: UploadItem) -> None:
+        """Keep an item that was still queued or waiting for a retry at shutdown."""
+        if item.journal_id is not None:
+            return  # Resumed from the journal
+        if self.unsent_directory:
+            self._keep_unsent(item)
+        else:
+            logger.warning("Dropping unsent %s at shutdown: no unsent directory.", item.name)
+        self._notify(item, False)
+
+    def _keep_unsent(self, item: UploadItem, permanent: bool = False) -> None:
+        """Persist a failed item to the unsent directory and hand it off from the journal."""
+        unsent_path = item.persist_unsent(self.unsent_directory, permanent=permanent)
+        if unsent_path is None:
+            return  # Still journaled, if at all, so the next start retries it
+        self._complete(item)
+        if item.on_unsent:
+            try:
+                item.on_unsent(unsent_path)
+            except Exception as e:
+                logger.error("Unsent callback failed: %s", e)
+
+    @staticmethod
+    def _record_delivery(item: UploadItem) -> None:
+        """Count a delivered item and record its end-to-end latency."""
+        metrics.inc("uploads_total")
+        if item.captured_at is not None:
+            metrics.observe("end_to_end_seconds", time.monotonic() - item.captured_at)
+
+    def _complete(self, item: UploadItem) -> None:
+        """Drop a sent or unsent-persisted item from the journal."""
+        if self.journal and item.journal_id is not None:
+            self.journal.complete(item.journal_id)
+
+    def _notify(self, item: UploadItem, success: bool) -> None:
+        """Invoke the item's completion callback, if any."""
+        if item.on_complete:
+            try:
+                item.on_complete(success)
+            except Exception as e:
+                logger.error("Upload completion callback failed: %s", e)
+
+    def _mark_online(self) -> None:
+        """Note a successful send and fire the connectivity callback after an outage."""
+        if self.offline:
+            self.offline = False
+            logger.info("Connectivity to Telegram restored.")
+            if self.on_connectivity_restored:
+                self.on_connectivity_restored()
+
+    def _send_album(self, batch: list) -> None:
+        """
+        Send several screenshots as one media group, falling back to single sends on failure.
+
+        The album is uploaded to the first channel and forwarded to the others
+        by file_id.
+
+        Args:
+            batch: List of upload items.
+        """
+        channel_id = self.channel_id
+        try:
+            self.rate_limiter.acquire(channel_id, len(batch))
+            with contextlib.ExitStack() as stack:
+                media = [
+                    telebot.types.InputMediaPhoto(stack.enter_context(item.open()), caption=item.caption)
+                    for item in batch
+                ]
+                start = time.monotonic()
+                messages = self.bot.send_media_group(channel_id, media)
+                elapsed = time.monotonic() - start
+                size = sum(item.size for item in batch)
+                metrics.observe("album_upload_seconds", elapsed)
+                metrics.inc("bytes_uploaded_total", size)
+                self.bandwidth.record(size, elapsed)
+            for item, message in zip(batch, messages):
+                item.delivered.add(channel_id)
+                self._remember_file_id(item, "photo", get_file_id(message, "photo"))
+            for channel_id in self.channel_ids[1:]:
+                if not all(item.file_id for item in batch):
+                    break  # Leave the remaining channels to the single sends
+                self.rate_limiter.acquire(channel_id, len(batch))
+                self.bot.send_media_group(channel_id, [
+                    telebot.types.InputMediaPhoto(item.file_id[1], caption=item.caption) for item in batch
+                ])
+                metrics.inc("file_id_reuses_total", len(batch))
+                for item in batch:
+                    item.delivered.add(channel_id)
+        except Exception as e:
+            logger.warning("Album of %s screenshots failed, falling back to single sends: %s", len(batch), e)
+            retry_after = get_retry_after(e)
+            if retry_after is not None:
+                self.rate_limiter.penalize(channel_id, retry_after)
+        if not all(len(item.delivered) == len(self.channel_ids) for item in batch):
+            for item in batch:
+                self._process_screenshot(item)
+            return
+        self._mark_online()
+        for item in batch:
+            self._record_delivery(item)
+            item.discard()
+            self._complete(item)
+            self._notify(item, True)
+        logger.info("Album of %s screenshots sent successfully.", len(batch))
+
+    def _send_screenshot(self, item: UploadItem):
+        """
+        Make a single attempt to send a screenshot or message to every channel it has not reached yet.
+
+        Args:
+            item: Screenshot or message to send. Its attempt count is increased on failure.
 
         Returns:
-            bool: True if successful, False otherwise.
+            None if the item was sent, otherwise the delay in seconds before the
+            next attempt, or -1 if the error is permanent.
         """
-        for attempt in range(self.max_retry_attempts):
+        while True:
+            attempt = item.attempts
+            channel_id = self.channel_id
             try:
-                with open(image_path, 'rb') as photo:
-                    self.bot.send_photo(self.channel_id, photo, caption=caption)
-                safe_delete(image_path)
-                logger.info(f"Screenshot sent successfully: {image_path} (Caption: {caption})")
-                return True
+                for channel_id in self.channel_ids:
+                    if channel_id not in item.delivered:
+                        self.rate_limiter.acquire(channel_id)
+                        self._deliver(item, channel_id)
+                        item.delivered.add(channel_id)
+                item.discard()
+                self._complete(item)
+                self._mark_online()
+                if item.is_text:
+                    logger.info("Message sent successfully: %s", item.filename)
+                else:
+                    logger.info("Screenshot sent successfully: %s (Caption: %s)", item.name, item.caption)
+                return None
             except telebot.apihelper.ApiException as api_error:
-                logger.warning(f"Telegram API error (Attempt {attempt + 1}/{self.max_retry_attempts}): {api_error}")
-                if attempt < self.max_retry_attempts - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
+                logger.warning("Telegram API error for %s (Attempt %s/%s): %s",
+                               channel_id, attempt + 1, self.max_retry_attempts, api_error)
+                error = api_error
             except Exception as e:
-                logger.error(f"Error sending screenshot (Attempt {attempt + 1}/{self.max_retry_attempts}): {e}")
-                if attempt < self.max_retry_attempts - 1:
-                    time.sleep(2 ** attempt)
-        logger.error(f"Failed to send screenshot after {self.max_retry_attempts} attempts: {image_path}")
-        return False
+                logger.error("Error sending screenshot (Attempt %s/%s): %s", attempt + 1, self.max_retry_attempts, e)
+                error = e
+            if is_network_error(error):
+                self.offline = True
+            if is_photo_rejected(error) and not item.is_text and item.media_kind == "photo":
+                # Retry right away as a document, which has no dimension limits
+                logger.info("Photo rejected by Telegram, sending as a document instead: %s", item.name)
+                item.as_document = True
+                continue
+            item.attempts += 1
+            metrics.inc("upload_attempt_errors_total")
+            if not is_retryable(error):
+                return -1
+            retry_after = get_retry_after(error)
+            if retry_after is not None:
+                # The limiter makes every worker targeting this channel wait, not just this one
+                self.rate_limiter.penalize(channel_id, retry_after)
+                return retry_after
+            return 2 ** attempt  # Exponential backoff
+
+    def _deliver(self, item: UploadItem, channel_id: str) -> None:
+        """
+        Send an item to one channel, by file_id if its content was uploaded before.
+
+        Args:
+            item: Screenshot or message to send.
+            channel_id: Target channel.
+
+        Raises:
+            Exception: Whatever the Telegram call raised.
+        """
+        if item.is_text:
+            self.bot.send_message(chat_id=channel_id, text=item.text)
+            return
+        kind = item.media_kind
+        file_id = item.file_id[1] if item.file_id and item.file_id[0] == kind else None
+        cache_key = None
+        if self.file_ids is not None:
+            cache_key = (item.content_hash(), kind)
+            file_id = file_id or self.file_ids.get(cache_key)
+        if file_id:
+            try:
+                self._send_file(channel_id, file_id, kind, item)
+                metrics.inc("file_id_reuses_total")
+                return
+            except telebot.apihelper.ApiTelegramException as e:
+                if e.error_code != 400:
+                    raise
+                # The stored file is no longer usable; upload the bytes again
+                logger.info("Cached file_id rejected, uploading %s again: %s", item.name, e)
+                item.file_id = None
+                if cache_key:
+                    self.file_ids.discard(cache_key)
+
+        with item.open() as f:
+            start = time.monotonic()
+            message = self._send_file(channel_id, f, kind, item)
+        elapsed = time.monotonic() - start
+        size = item.size
+        metrics.observe("upload_seconds", elapsed)
+        metrics.inc("bytes_uploaded_total", size)
+        self.bandwidth.record(size, elapsed)
+        self._remember_file_id(item, kind, get_file_id(message, kind))
+
+    def _send_file(self, channel_id: str, file, kind: str, item: UploadItem):
+        """Send a file object or file_id as a photo, document or animation."""
+        if kind == "animation":
+            return self.bot.send_animation(channel_id, file, caption=item.caption)
+        if kind == "document":
+            return self.bot.send_document(channel_id, file, caption=item.caption, visible_file_name=item.filename)
+        return self.bot.send_photo(channel_id, file, caption=item.caption)
+
+    def _remember_file_id(self, item: UploadItem, kind: str, file_id: str = None) -> None:
+        """Keep the file_id of an upload for the item's other channels and for identical content."""
+        if not file_id:
+            return
+        item.file_id = (kind, file_id)
+        if self.file_ids is not None:
+            self.file_ids.put((item.content_hash(), kind), file_id)
+
+
+class UnsentRedrainer:
+    def __init__(self, uploader: TelegramScreenshotUploader, interval: float = 2.0,
+                 base_backoff: float = 30.0, max_backoff: float = 1800.0):
+        """
+        Re-enqueue files from the unsent directory at a controlled rate.
+
+        A round starts at startup and whenever connectivity returns. Backlog files
+        are queued one at a time with PRIORITY_BACKLOG and only while no live
+        capture is waiting, so new screenshots always go first. If a round has
+        failures the next one is delayed by a jittered exponential backoff.
+        Files keep the caption and media kind recorded in their sidecar and are
+        only sent to the channels it does not list as reached; permanently
+        failed files are quarantined and never re-drained.
+
+        Args:
+            uploader: Uploader that sends the re-enqueued files.
+            interval: Seconds between two re-enqueued backlog files.
+            base_backoff: Seconds to wait before rescanning after a failed round.
+            max_backoff: Upper bound for the exponential backoff between rounds.
+        """
+        self.uploader = uploader
+        self.interval = interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.backoff = base_backoff
+        self.in_flight = set()
+        # Sent files the janitor has not deleted yet
+        self.sent = set()
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.wake_event.set()  # Drain once at startup
+        self.thread = threading.Thread(target=self._run, daemon=True, name="UnsentRedrainer")
+        self.thread.start()
+        logger.info("Unsent re-drain started for: %s", uploader.unsent_directory)
+
+    def trigger(self) -> None:
+        """Start a new round as soon as possible, e.g. after connectivity returns."""
+        self.backoff = self.base_backoff
+        self.wake_event.set()
+
+    def stop(self) -> None:
+        """Stop the re-drain thread."""
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def _run(self) -> None:
+        """Re-drain thread alternating between rounds and waiting."""
+        while not self.stop_event.is_set():
+            self.wake_event.wait()
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                return
+            try:
+                queued = self._drain_round()
+            except Exception as e:
+                logger.error("Unexpected error re-draining unsent screenshots: %s", e)
+                queued = 0
+            self._wait_for_in_flight()
+            if queued and self.failures:
+                delay = self.backoff * random.uniform(0.5, 1.5)
+                logger.info("Re-drain round had %s failure(s), next round in %.0fs", self.failures, delay)
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                self.wake_event.wait(delay)
+                self.wake_event.set()
+            elif queued:
+                self.backoff = self.base_backoff
+
+    def _drain_round(self) -> int:
+        """
+        Queue every unsent file that is not already in flight.
+
+        Returns:
+            int: Number of files queued in this round.
+        """
+        directory = self.uploader.unsent_directory
+        with os.scandir(directory) as entries:
+            files = sorted(
+                (entry for entry in entries
+                 if entry.is_file() and entry.name.lower().endswith(UNSENT_EXTENSIONS)),
+                key=lambda entry: entry.stat().st_mtime
+            )
+        with self.lock:
+            self.sent &= {entry.path for entry in files}
+        self.failures = 0
+        queued = 0
+        for entry in files:
+            # Live captures take priority: hold the backlog while any are waiting
+            while self.uploader.pending_count(PRIORITY_LIVE) and not self.stop_event.is_set():
+                time.sleep(self.interval)
+            if self.stop_event.is_set():
+                break
+            with self.lock:
+                if entry.path in self.in_flight or entry.path in self.sent:
+                    continue
+            text = None
+            if entry.name.lower().endswith('.txt'):
+                # Read before the in-flight bookkeeping, so a bad file never stalls the round
+                try:
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        text = f.read()
+                except FileNotFoundError:
+                    continue  # Deleted since the scan
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.error("Quarantining unreadable unsent message %s: %s", entry.path, e)
+                    quarantine = os.path.join(directory, QUARANTINE_DIRECTORY)
+                    os.makedirs(quarantine, exist_ok=True)
+                    move_to_unsent(entry.path, quarantine)
+                    continue
+            with self.lock:
+                self.in_flight.add(entry.path)
+            metadata = read_unsent_metadata(entry.path)
+            # Without a sidecar, e.g. a file dropped in by hand, a .gif is still sent as an animation
+            media_kind = metadata.get("media_kind") or ("animation" if entry.name.lower().endswith('.gif') else None)
+            item = UploadItem(
+                metadata.get("caption"),
+                image_path=entry.path,
+                priority=PRIORITY_BACKLOG,
+                on_complete=lambda success, path=entry.path: self._on_complete(path, success),
+                text=text,
+                as_document=media_kind == "document",
+                as_animation=media_kind == "animation"
+            )
+            item.delivered = set(metadata.get("delivered", ()))
+            self.uploader._put(item)
+            queued += 1
+            time.sleep(self.interval)
+        if queued:
+            logger.info("Re-enqueued %s unsent file(s).", queued)
+        return queued
+
+    def _wait_for_in_flight(self) -> None:
+        while not self.stop_event.is_set():
+            with self.lock:
+                if not self.in_flight:
+                    return
+            time.sleep(self.interval)
+
+    def _on_complete(self, path: str, success: bool) -> None:
+        with self.lock:
+            self.in_flight.discard(path)
+            if success:
+                self.sent.add(path)
+            else:
+                self.failures += 1
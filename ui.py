@@ -1,11 +1,11 @@
 import os
+import time
 import threading
 import keyboard
-from PIL import ImageGrab
-from datetime import datetime
 import customtkinter as ctk
-from telegram_uploader import TelegramScreenshotUploader
-from config_manager import load_config, save_config
+from telegram_client import validate_token
+from capture_pipeline import CapturePipeline
+from config_manager import load_config, save_config, load_settings
 import logging
 import telebot
 
@@ -25,11 +25,16 @@ class DraggableApp(ctk.CTk):
         self.api_token = None
         self.channel_id = None
         self.save_path = None
-        self.screenshot_uploader = None
+        self.pipeline = None
+        self.settings = load_settings()
+        # Copy of the caption entry, so capture threads never read the widget
+        self.caption = ""
+        # First corner of a capture region being marked with the pointer
+        self.region_corner = None
 
         self.prompts = [
             "Enter your Telegram API Token:",
-            "Enter your channel ID (e.g., -1001234567890):",
+            "Enter your channel ID, or several separated by commas (e.g., -1001234567890):",
             "Enter the file path for saving screenshots:",
             "Set a password for encryption:"
         ]
@@ -57,7 +62,9 @@ class DraggableApp(ctk.CTk):
 
         self.caption_label = ctk.CTkLabel(self.frame, text="Enter caption (optional):", wraplength=380)
         self.caption_label.pack(pady=5)
-        self.caption_entry = ctk.CTkEntry(self.frame, width=300)
+        self.caption_var = ctk.StringVar()
+        self.caption_var.trace_add("write", self.on_caption_changed)
+        self.caption_entry = ctk.CTkEntry(self.frame, width=300, textvariable=self.caption_var)
         self.caption_entry.pack(pady=5)
 
         self.message_label = ctk.CTkLabel(self.frame, text="Type your message here:", wraplength=380)
@@ -83,29 +90,58 @@ class DraggableApp(ctk.CTk):
         self.entry.bind("<Return>", lambda event: self.verify_password())
         logger.info("Setting up password prompt for existing user.")
 
+    def run_in_background(self, task, on_done, name: str):
+        """Run a blocking task off the Tk thread and hand (result, error) to on_done on the Tk thread."""
+        def worker():
+            try:
+                result, error = task(), None
+            except Exception as e:
+                result, error = None, e
+            self.after(0, on_done, result, error)
+
+        threading.Thread(target=worker, daemon=True, name=name).start()
+
+    def set_busy(self, message: str = None):
+        state = "disabled" if message else "normal"
+        self.button.configure(state=state)
+        self.entry.configure(state=state)
+        if message:
+            self.status_label.configure(text=message, text_color="orange")
+
     def verify_password(self, event=None):
+        if self.button.cget("state") == "disabled":
+            return
         password = self.entry.get().strip()
         self.entry.delete(0, ctk.END)
-        try:
-            config = load_config(password)
-            self.api_token = config["api_token"]
-            self.channel_id = config["channel_id"]
-            self.save_path = config["save_path"]
 
-            logger.info(f"Fetched API Token: {self.api_token}")
-            logger.info(f"Fetched Channel ID: {self.channel_id}")
-            logger.info(f"Fetched Save Path: {self.save_path}")
+        def unlock():
+            config = load_config(password)
+            validate_token(config["api_token"])
+            return config
 
-            bot = telebot.TeleBot(self.api_token)
-            bot.get_me()  # Validate API token
+        self.set_busy("Unlocking...")
+        self.run_in_background(unlock, self.on_unlocked, "ConfigUnlock")
 
-            self.show_capture_instruction()
-        except ValueError as e:
-            self.status_label.configure(text=str(e), text_color="red")
-            logger.error(f"Password verification failed: {e}")
-        except Exception as e:
+    def on_unlocked(self, config, error):
+        self.set_busy()
+        if isinstance(error, ValueError):
+            self.status_label.configure(text=str(error), text_color="red")
+            logger.error("Password verification failed: %s", error)
+            return
+        if error is not None:
             self.status_label.configure(text="Invalid configuration", text_color="red")
-            logger.error(f"Error verifying password: {e}")
+            logger.error("Error verifying password: %s", error)
+            return
+        self.api_token = config["api_token"]
+        self.channel_id = config["channel_id"]
+        self.save_path = config["save_path"]
+
+        logger.info("Fetched API Token: %s", self.api_token)
+        logger.info("Fetched Channel ID: %s", self.channel_id)
+        logger.info("Fetched Save Path: %s", self.save_path)
+
+        self.status_label.configure(text="")
+        self.show_capture_instruction()
 
     def handle_input(self, event=None):
         if not self.is_new_user:
@@ -116,24 +152,25 @@ class DraggableApp(ctk.CTk):
 
         if self.input_index == 0:
             self.api_token = current_input
-            logger.info(f"API Token entered: {self.api_token}")
+            logger.info("API Token entered: %s", self.api_token)
         elif self.input_index == 1:
             self.channel_id = current_input
-            logger.info(f"Channel ID entered: {self.channel_id}")
+            logger.info("Channel ID entered: %s", self.channel_id)
         elif self.input_index == 2:
             self.save_path = current_input
-            logger.info(f"Save Path entered: {self.save_path}")
+            logger.info("Save Path entered: %s", self.save_path)
         elif self.input_index == 3:
             if not all([self.api_token, self.channel_id, self.save_path]):
                 self.status_label.configure(text="All fields are required", text_color="red")
                 logger.warning("Configuration save attempted with missing fields.")
                 return
-            try:
-                save_config(self.api_token, self.channel_id, self.save_path, current_input)
-                self.show_capture_instruction()
-            except RuntimeError as e:
-                self.status_label.configure(text=str(e), text_color="red")
-                return
+            self.set_busy("Encrypting configuration...")
+            self.run_in_background(
+                lambda: save_config(self.api_token, self.channel_id, self.save_path, current_input),
+                self.on_config_saved,
+                "ConfigSave"
+            )
+            return
 
         self.input_index += 1
         if self.input_index < len(self.prompts):
@@ -141,24 +178,33 @@ class DraggableApp(ctk.CTk):
             self.entry.configure(show='*' if show_asterisk else '')
             self.label.configure(text=self.prompts[self.input_index])
 
+    def on_config_saved(self, result, error):
+        self.set_busy()
+        if error is not None:
+            self.status_label.configure(text=str(error), text_color="red")
+            return
+        self.input_index += 1
+        self.status_label.configure(text="")
+        self.show_capture_instruction()
+
     def show_capture_instruction(self):
         if not os.path.isdir(self.save_path):
             self.status_label.configure(text="Invalid save path provided.", text_color="red")
-            logger.error(f"Invalid save path: {self.save_path}")
+            logger.error("Invalid save path: %s", self.save_path)
             return
         try:
-            logger.info(f"Using API Token: {self.api_token}")
-            logger.info(f"Using Channel ID: {self.channel_id}")
-            logger.info(f"Using Save Path: {self.save_path}")
-
-            bot = telebot.TeleBot(self.api_token)
-            bot.get_me()  # Validate API token
-
-            unsent_directory = os.path.join(self.save_path, 'unsent')
-            os.makedirs(unsent_directory, exist_ok=True)
-
-            self.screenshot_uploader = TelegramScreenshotUploader(bot, self.channel_id)
-            self.screenshot_uploader.set_unsent_directory(unsent_directory)
+            logger.info("Using API Token: %s", self.api_token)
+            logger.info("Using Channel ID: %s", self.channel_id)
+            logger.info("Using Save Path: %s", self.save_path)
+
+            pipeline = CapturePipeline(self.api_token, self.channel_id, self.save_path)
+            pipeline.caption_provider = lambda: self.caption
+            pipeline.on_queued = lambda filename: self.after(
+                0, lambda: self.status_label.configure(text=f"Screenshot queued: {filename}", text_color="green")
+            )
+            pipeline.start()
+            self.pipeline = pipeline
+            self.settings = pipeline.settings
 
             threading.Thread(
                 target=self.screen_capture,
@@ -167,7 +213,7 @@ class DraggableApp(ctk.CTk):
                 name="ScreenCapture"
             ).start()
             threading.Thread(
-                target=bot.polling,
+                target=self.pipeline.bot.polling,
                 kwargs={"non_stop": True},
                 daemon=True,
                 name="TelegramPolling"
@@ -176,68 +222,141 @@ class DraggableApp(ctk.CTk):
             self.label.pack_forget()
             self.entry.pack_forget()
             self.button.pack_forget()
+            replay_line = "Ctrl + Shift + R to send the last moments\n" if self.pipeline.replay else ""
             self.status_label.configure(
-                text="Press Shift + ` to take a screenshot\nCtrl + ] to restore window",
+                text="Press Shift + ` to take a screenshot\nCtrl + Shift + ` to change capture mode\n"
+                     "Ctrl + Shift + I to toggle interval capture\nCtrl + Shift + B to capture a burst\n"
+                     f"{replay_line}Ctrl + Shift + G at two corners to set the capture region\n"
+                     "Ctrl + ] to restore window",
                 text_color="green"
             )
             self.background_button = ctk.CTkButton(self.frame, text="Go to Background", command=self.hide_ctk)
             self.background_button.pack(pady=5)
-            keyboard.add_hotkey("ctrl + ]", self.restore_ctk)
+            keyboard.add_hotkey("ctrl + ]", lambda: self.after(0, self.restore_ctk))
 
             logger.info("Capture instructions displayed successfully.")
 
         except telebot.apihelper.ApiException as e:
             self.status_label.configure(text=f"Invalid API token or channel ID: {e}", text_color="red")
-            logger.error(f"Telegram API error: {e}")
+            logger.error("Telegram API error: %s", e)
         except Exception as e:
             self.status_label.configure(text=f"Setup failed: {e}", text_color="red")
-            logger.error(f"Error initializing screenshot uploader: {e}")
+            logger.error("Error initializing screenshot uploader: %s", e)
 
     def screen_capture(self, path: str):
-        keyboard.add_hotkey("shift + `", lambda: self.capture_and_save_screen(path))
+        # Hotkey callbacks run on the keyboard hook thread: they only signal other threads
+        keyboard.add_hotkey("shift + `", self.on_capture_hotkey)
+        keyboard.add_hotkey("ctrl + shift + `", lambda: self.after(0, self.cycle_capture_mode))
+        keyboard.add_hotkey("ctrl + shift + i", lambda: self.after(0, self.toggle_interval_capture))
+        keyboard.add_hotkey("ctrl + shift + b", lambda: self.after(0, self.start_burst_capture))
+        keyboard.add_hotkey("ctrl + shift + g", lambda: self.after(0, self.mark_region_corner))
+        if self.pipeline.replay:
+            keyboard.add_hotkey("ctrl + shift + r", self.on_replay_hotkey)
+        logger.info("Screen capture hotkeys registered.")
         keyboard.wait("esc")
-        logger.info("Screen capture thread started.")
 
-    def capture_and_save_screen(self, path: str):
+    def on_capture_hotkey(self):
+        future = self.pipeline.request_capture(requested_at=time.monotonic())
+        future.add_done_callback(lambda done: self.after(0, self.on_captured, done))
+
+    def on_captured(self, future):
         try:
-            screenshot = ImageGrab.grab()
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")[:-3]
-            filename = f"screenshot_{timestamp}.png"
-            save_path = os.path.join(path, filename)
-            screenshot.save(save_path)
-            logger.info(f"Screenshot saved: {save_path}")
-
-            caption = self.caption_entry.get().strip()
-
-            if self.screenshot_uploader:
-                self.screenshot_uploader.enqueue_screenshot(save_path, caption=caption)
-                self.status_label.configure(text=f"Screenshot queued: {filename}", text_color="green")
-            else:
-                logger.error("Screenshot uploader not initialized.")
-                self.status_label.configure(text="Screenshot uploader not ready", text_color="red")
+            stem = future.result()
         except Exception as e:
-            logger.error(f"Error capturing screenshot: {e}")
             self.status_label.configure(text=f"Failed to capture screenshot: {e}", text_color="red")
+            return
+        if stem is None:
+            self.status_label.configure(text="Screen unchanged, screenshot skipped", text_color="orange")
+        else:
+            self.status_label.configure(text=f"Screenshot captured: {stem}", text_color="green")
 
-    def send_message(self, event=None):
+    def on_replay_hotkey(self):
+        future = self.pipeline.save_replay()
+        future.add_done_callback(lambda done: self.after(0, self.on_replay_saved, done))
+
+    def on_replay_saved(self, future):
         try:
-            message = self.message_textbox.get("1.0", "end").strip()
-            if not message:
-                self.status_label.configure(text="Message cannot be empty", text_color="red")
-                return
+            name = future.result()
+        except Exception as e:
+            self.status_label.configure(text=f"Failed to save replay: {e}", text_color="red")
+            return
+        if name is None:
+            self.status_label.configure(text="Replay buffer is still empty", text_color="orange")
+        else:
+            self.status_label.configure(text=f"Replay queued: {name}", text_color="green")
+
+    def on_caption_changed(self, *args):
+        self.caption = self.caption_var.get().strip()
+
+    def cycle_capture_mode(self):
+        try:
+            label = self.pipeline.cycle_capture_mode()
+            self.status_label.configure(text=f"Capture mode: {label}", text_color="green")
+        except RuntimeError as e:
+            self.status_label.configure(text=str(e), text_color="red")
+
+    def mark_region_corner(self):
+        x, y = self.winfo_pointerxy()
+        if self.region_corner is None:
+            self.region_corner = (x, y)
+            self.status_label.configure(
+                text=f"Region corner marked at {x},{y}. Press Ctrl + Shift + G at the opposite corner",
+                text_color="orange"
+            )
+            return
+        (first_x, first_y), self.region_corner = self.region_corner, None
+        region = (min(first_x, x), min(first_y, y), max(first_x, x), max(first_y, y))
+        try:
+            label = self.pipeline.set_capture_region(region)
+            self.status_label.configure(text=f"Capture {label}", text_color="green")
+        except (ValueError, RuntimeError) as e:
+            self.status_label.configure(text=str(e), text_color="red")
+
+    def toggle_interval_capture(self):
+        scheduler = self.pipeline.scheduler
+        if scheduler.running:
+            scheduler.stop()
+            stats = scheduler.stats()
+            self.status_label.configure(
+                text=f"Interval capture stopped: {stats['achieved_fps']:.2f}/{stats['target_fps']:.2f} fps, "
+                     f"{stats['dropped']} dropped",
+                text_color="green"
+            )
+        else:
+            scheduler.start_interval(self.settings["interval_seconds"])
+            self.status_label.configure(
+                text=f"Capturing every {self.settings['interval_seconds']}s", text_color="green"
+            )
 
-            bot = telebot.TeleBot(self.api_token)
-            bot.send_message(chat_id=self.channel_id, text=message)
-            logger.info(f"Message sent to channel: {message}")
+    def start_burst_capture(self):
+        self.pipeline.scheduler.start_burst(self.settings["burst_frames"], self.settings["burst_fps"])
+        self.status_label.configure(
+            text=f"Capturing {self.settings['burst_frames']} frames at {self.settings['burst_fps']} fps",
+            text_color="green"
+        )
 
-            self.message_textbox.delete("1.0", "end")
+    def send_message(self, event=None):
+        message = self.message_textbox.get("1.0", "end").strip()
+        if not message:
+            self.status_label.configure(text="Message cannot be empty", text_color="red")
+            return
+        if not self.pipeline:
+            self.status_label.configure(text="Uploader not ready", text_color="red")
+            return
+
+        self.pipeline.send_text(
+            message,
+            on_complete=lambda success: self.after(0, self.on_message_sent, success)
+        )
+        self.message_textbox.delete("1.0", "end")
+        self.status_label.configure(text="Sending message...", text_color="orange")
+        return "break"
+
+    def on_message_sent(self, success: bool):
+        if success:
             self.status_label.configure(text="Message sent successfully!", text_color="green")
-        except telebot.apihelper.ApiException as e:
-            logger.error(f"Telegram API error sending message: {e}")
-            self.status_label.configure(text=f"Failed to send message: {e}", text_color="red")
-        except Exception as e:
-            logger.error(f"Error sending message: {e}")
-            self.status_label.configure(text=f"Failed to send message: {e}", text_color="red")
+        else:
+            self.status_label.configure(text="Failed to send message, saved to unsent", text_color="red")
 
     def start_drag(self, event):
         self.start_x = event.x_root
@@ -0,0 +1,158 @@
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UploadJournal:
+    def __init__(self, path: str, commit_interval: float = 0.05):
+        """
+        Open a crash-safe journal of pending uploads backed by SQLite in WAL mode.
+
+        Writes are buffered in memory and committed by a background thread in
+        groups, so recording an enqueue costs a lock and a list append instead
+        of an fsync.
+
+        Args:
+            path: Path to the SQLite database file.
+            commit_interval: Maximum seconds a write waits before its group is committed.
+        """
+        self.path = path
+        self.commit_interval = commit_interval
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            "id INTEGER PRIMARY KEY, "
+            "image_path TEXT NOT NULL, "
+            "caption TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt REAL NOT NULL DEFAULT 0, "
+            "created REAL NOT NULL, "
+            "delivered TEXT)"
+        )
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(uploads)")}
+        if "delivered" not in columns:
+            # Journals written before multi-channel delivery was recorded
+            self.connection.execute("ALTER TABLE uploads ADD COLUMN delivered TEXT")
+        self.next_id = (self.connection.execute("SELECT MAX(id) FROM uploads").fetchone()[0] or 0) + 1
+        self.pending_writes = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.db_lock = threading.Lock()
+        self.writer_thread = threading.Thread(target=self._writer, daemon=True, name="UploadJournalWriter")
+        self.writer_thread.start()
+        logger.info("Upload journal opened: %s", path)
+
+    def add(self, image_path: str, caption: str = None) -> int:
+        """
+        Record a newly enqueued upload.
+
+        Args:
+            image_path: Path to the screenshot file.
+            caption: Caption the screenshot will be sent with.
+
+        Returns:
+            int: Journal ID of the entry.
+        """
+        with self.condition:
+            entry_id = self.next_id
+            self.next_id += 1
+            self.pending_writes.append((
+                "INSERT INTO uploads (id, image_path, caption, created) VALUES (?, ?, ?, ?)",
+                (entry_id, image_path, caption, time.time())
+            ))
+            self.condition.notify()
+        return entry_id
+
+    def record_attempt(self, entry_id: int, attempts: int, next_attempt: float, delivered=()) -> None:
+        """
+        Record a failed attempt and when the next one is due.
+
+        Args:
+            entry_id: Journal ID of the entry.
+            attempts: Number of attempts made so far.
+            next_attempt: Wall-clock time (time.time()) of the next attempt.
+            delivered: Channel IDs the upload already reached, so a resumed
+                upload is only sent to the rest.
+        """
+        self._write("UPDATE uploads SET attempts = ?, next_attempt = ?, delivered = ? WHERE id = ?",
+                    (attempts, next_attempt, json.dumps(sorted(delivered)) if delivered else None, entry_id))
+
+    def complete(self, entry_id: int) -> None:
+        """
+        Remove an entry once it was sent or handed off to the unsent directory.
+
+        Args:
+            entry_id: Journal ID of the entry.
+        """
+        self._write("DELETE FROM uploads WHERE id = ?", (entry_id,))
+
+    def pending(self) -> list:
+        """
+        List entries that have not completed yet, oldest first.
+
+        Returns:
+            list: Tuples of (id, image_path, caption, attempts, next_attempt, delivered),
+                delivered being a list of channel IDs.
+        """
+        self.flush()
+        with self.db_lock:
+            rows = self.connection.execute(
+                "SELECT id, image_path, caption, attempts, next_attempt, delivered FROM uploads ORDER BY id"
+            ).fetchall()
+        return [row[:5] + (json.loads(row[5]) if row[5] else [],) for row in rows]
+
+    def flush(self) -> None:
+        """Commit all buffered writes now."""
+        with self.condition:
+            writes, self.pending_writes = self.pending_writes, []
+        self._commit(writes)
+
+    def close(self) -> None:
+        """Commit buffered writes and close the database."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.writer_thread.join()
+        self.flush()
+        with self.db_lock:
+            self.connection.close()
+        logger.info("Upload journal closed.")
+
+    def _write(self, sql: str, params: tuple) -> None:
+        with self.condition:
+            self.pending_writes.append((sql, params))
+            self.condition.notify()
+
+    def _writer(self) -> None:
+        """Writer thread committing buffered writes in groups."""
+        while True:
+            with self.condition:
+                while not self.pending_writes and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+            # Let more writes join this group before committing
+            time.sleep(self.commit_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Failed to commit upload journal: %s", e)
+
+    def _commit(self, writes: list) -> None:
+        if not writes:
+            return
+        with self.db_lock:
+            self.connection.execute("BEGIN")
+            try:
+                for sql, params in writes:
+                    self.connection.execute(sql, params)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
@@ -1,9 +1,16 @@
 import os
 import time
+import shutil
+import heapq
+import itertools
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+_janitor = None
+_janitor_lock = threading.Lock()
+
 
 def safe_delete(file_path: str, attempts: int = 3, delay: float = 1) -> None:
     """
@@ -17,29 +24,78 @@ def safe_delete(file_path: str, attempts: int = 3, delay: float = 1) -> None:
     for attempt in range(attempts):
         try:
             os.remove(file_path)
-            logger.info(f"File deleted successfully: {file_path}")
+            logger.info("File deleted successfully: %s", file_path)
             return
         except Exception as e:
-            logger.warning(f"Attempt {attempt + 1}/{attempts} to delete {file_path} failed: {e}")
+            logger.warning("Attempt %s/%s to delete %s failed: %s", attempt + 1, attempts, file_path, e)
             if attempt < attempts - 1:
                 time.sleep(delay)
-    logger.error(f"Failed to delete file after {attempts} attempts: {file_path}")
+    logger.error("Failed to delete file after %s attempts: %s", attempts, file_path)
 
 
-def move_to_unsent(file_path: str, unsent_directory: str) -> None:
+def move_to_unsent(file_path: str, unsent_directory: str):
     """
     Move a file to the unsent directory if sending fails.
 
     Args:
         file_path: Path to the file to move.
         unsent_directory: Destination directory for unsent files.
+
+    Returns:
+        The path of the moved file, or None if moving failed.
     """
     try:
         destination = os.path.join(unsent_directory, os.path.basename(file_path))
         os.rename(file_path, destination)
-        logger.warning(f"Screenshot moved to unsent directory: {destination}")
+        logger.warning("Screenshot moved to unsent directory: %s", destination)
+        return destination
     except Exception as e:
-        logger.error(f"Failed to move screenshot to unsent directory: {e}")
+        logger.error("Failed to move screenshot to unsent directory: %s", e)
+        return None
+
+
+def unique_path(directory: str, filename: str) -> str:
+    """
+    Pick a path in a directory that does not exist yet, numbering the name if needed.
+
+    Args:
+        directory: Target directory.
+        filename: Preferred file name, e.g. "a.png"; "a_1.png", "a_2.png" and so on are tried next.
+
+    Returns:
+        str: The free path.
+    """
+    stem, extension = os.path.splitext(filename)
+    destination = os.path.join(directory, filename)
+    for index in itertools.count(1):
+        if not os.path.lexists(destination):
+            return destination
+        destination = os.path.join(directory, f"{stem}_{index}{extension}")
+
+
+def copy_to_unsent(file_path: str, unsent_directory: str):
+    """
+    Copy a file to the unsent directory if sending fails, leaving the original in place.
+
+    The copy gets a name of its own if the directory already holds one, e.g. a
+    pending copy of an earlier version of the file or of a namesake from
+    another directory.
+
+    Args:
+        file_path: Path to the file to copy.
+        unsent_directory: Destination directory for unsent files.
+
+    Returns:
+        The path of the copy, or None if copying failed.
+    """
+    try:
+        destination = unique_path(unsent_directory, os.path.basename(file_path))
+        shutil.copy2(file_path, destination)
+        logger.warning("Screenshot copied to unsent directory: %s", destination)
+        return destination
+    except Exception as e:
+        logger.error("Failed to copy screenshot to unsent directory: %s", e)
+        return None
 
 
 def retry_operation(func, *args, attempts: int = 3, delay: float = 1, **kwargs):
@@ -63,8 +119,173 @@ def retry_operation(func, *args, attempts: int = 3, delay: float = 1, **kwargs):
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            logger.warning(f"Operation {func.__name__} failed (Attempt {attempt + 1}/{attempts}): {e}")
+            logger.warning("Operation %s failed (Attempt %s/%s): %s", func.__name__, attempt + 1, attempts, e)
             if attempt < attempts - 1:
                 time.sleep(delay)
-    logger.error(f"Operation {func.__name__} failed after {attempts} attempts.")
+    logger.error("Operation %s failed after %s attempts.", func.__name__, attempts)
     raise Exception(f"Operation failed after {attempts} attempts.")
+
+
+def retry_operation_async(func, *args, attempts: int = 3, delay: float = 1, on_success=None,
+                          on_failure=None, scheduler=None, **kwargs) -> None:
+    """
+    Non-blocking variant of retry_operation.
+
+    Every attempt runs on the scheduler's thread and the delay between attempts
+    is scheduled rather than slept, so neither the caller nor other scheduled
+    work waits on a failing operation.
+
+    Args:
+        func: Function to retry.
+        attempts: Number of retry attempts.
+        delay: Delay between retries in seconds.
+        on_success: Optional callback invoked with the function's return value.
+        on_failure: Optional callback invoked with the last exception if all attempts fail.
+        scheduler: RetryScheduler to run the attempts on; the shared janitor if omitted.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+    """
+    scheduler = scheduler or get_janitor()
+
+    def attempt(number: int) -> None:
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logger.warning("Operation %s failed (Attempt %s/%s): %s", func.__name__, number + 1, attempts, e)
+            if number < attempts - 1:
+                scheduler.schedule(delay, attempt, number + 1)
+                return
+            logger.error("Operation %s failed after %s attempts.", func.__name__, attempts)
+            if on_failure:
+                on_failure(e)
+            return
+        if on_success:
+            on_success(result)
+
+    scheduler.schedule(0, attempt, 0)
+
+
+def delete_later(file_path: str, attempts: int = 3, delay: float = 1) -> None:
+    """
+    Delete a file on the background janitor thread, with retries.
+
+    Args:
+        file_path: Path to the file to delete.
+        attempts: Number of retry attempts.
+        delay: Delay between retries in seconds.
+    """
+    retry_operation_async(
+        os.remove, file_path, attempts=attempts, delay=delay,
+        on_success=lambda _: logger.info("File deleted successfully: %s", file_path),
+        on_failure=lambda _: logger.error("Failed to delete file after %s attempts: %s", attempts, file_path)
+    )
+
+
+def get_janitor() -> "RetryScheduler":
+    """
+    Get the shared scheduler for background housekeeping such as file deletion.
+
+    Returns:
+        RetryScheduler: The janitor, started on first use.
+    """
+    global _janitor
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = RetryScheduler(name="Janitor")
+        return _janitor
+
+
+class RetryScheduler:
+    def __init__(self, name: str = "RetryScheduler"):
+        """
+        Run callbacks after a delay on a single background thread.
+
+        Pending callbacks are kept in a heap keyed by due time, so one long
+        delay never holds back an earlier one.
+
+        Args:
+            name: Name of the scheduler thread.
+        """
+        self.heap = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self.thread.start()
+
+    def schedule(self, delay: float, func, *args) -> None:
+        """
+        Call func(*args) on the scheduler thread after a delay.
+
+        Callbacks should return quickly; anything slow belongs on another thread.
+
+        Args:
+            delay: Seconds to wait; callbacks with equal due times run in scheduling order.
+            func: Callback to run.
+            *args: Positional arguments for the callback.
+        """
+        due = time.monotonic() + max(0.0, delay)
+        with self.condition:
+            heapq.heappush(self.heap, (due, next(self.order), func, args))
+            self.condition.notify()
+
+    def pending(self) -> int:
+        """
+        Returns:
+            int: Number of callbacks waiting to run.
+        """
+        with self.condition:
+            return len(self.heap)
+
+    def drain(self) -> list:
+        """
+        Remove every pending callback without running it, e.g. after stop().
+
+        Returns:
+            list: (func, args) of the removed callbacks, earliest due first.
+        """
+        with self.condition:
+            entries, self.heap = sorted(self.heap), []
+        return [(func, args) for _, _, func, args in entries]
+
+    def stop(self) -> None:
+        """Stop the scheduler thread, dropping callbacks that are not due yet."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.stopped and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    self.condition.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                if self.stopped:
+                    return
+                _, _, func, args = heapq.heappop(self.heap)
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error("Scheduled callback %s failed: %s", getattr(func, '__name__', func), e)
+
+
+def write_to_unsent(data: bytes, filename: str, unsent_directory: str):
+    """
+    Write an in-memory screenshot to the unsent directory if sending fails.
+
+    Args:
+        data: Encoded image bytes.
+        filename: File name to use inside the unsent directory.
+        unsent_directory: Destination directory for unsent files.
+
+    Returns:
+        The path of the written file, or None if writing failed.
+    """
+    try:
+        destination = os.path.join(unsent_directory, filename)
+        with open(destination, 'wb') as f:
+            f.write(data)
+        logger.warning("Screenshot written to unsent directory: %s", destination)
+        return destination
+    except Exception as e:
+        logger.error("Failed to write screenshot to unsent directory: %s", e)
+        return None